@@ -1,26 +1,17 @@
 import discord
 from discord import app_commands, ui
-from discord.ext import commands
-import json
-import os
-from utils.database import update_config, get_config
+from discord.ext import commands, tasks
+from utils.database import transaction, get_config
+from utils.clan_store import clans
+from utils.pending_store import pending, PENDING_TTL
+from utils.concurrency import gather_bounded
+from utils.log_dispatcher import dispatcher
 
-# --- CLAN DATABASE MANAGER ---
-CLAN_FILE = "clans.json"
-
-def load_clans():
-    if not os.path.exists(CLAN_FILE):
-        return {}
-    with open(CLAN_FILE, "r") as f:
-        return json.load(f)
-
-def save_clans(data):
-    with open(CLAN_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+LEADERBOARD_PAGE_SIZE = 10
 
 # --- HELPER: SEND LOG TO CLAN-LOGS CHANNEL ---
 async def send_clan_log(guild, title, description, color):
-    conf = get_config(guild.id)
+    conf = await get_config(guild.id)
     log_channel_id = conf.get("clan_log_channel")
     if log_channel_id:
         channel = guild.get_channel(log_channel_id)
@@ -32,98 +23,176 @@ async def send_clan_log(guild, title, description, color):
                 timestamp=discord.utils.utcnow()
             )
             embed.set_footer(text="Clan System Log")
-            await channel.send(embed=embed)
+            dispatcher.queue(channel, embed, "log.clan")
+
+EXPIRED_MSG = "❌ This request has expired or was already handled."
+
+# --- HELPER: Run independent Discord calls and collect the ones that failed ---
+async def run_calls(action, calls):
+    """Runs (label, awaitable) pairs concurrently. Failures are logged; returns their labels."""
+    results = await gather_bounded(*(call for _, call in calls))
+    failed = []
+    for (label, _), result in zip(calls, results):
+        if isinstance(result, Exception):
+            print(f"[Clans] {action}: could not {label}: {result}")
+            failed.append(label)
+    return failed
+
+def failure_note(failed):
+    return f"⚠️ I could not {', '.join(failed)} (check my permissions and role position)."
+
+async def report_failures(interaction, failed):
+    """Tell the user which calls failed, if the interaction can still take a followup."""
+    if not failed or not interaction.response.is_done():
+        return
+    try:
+        await interaction.followup.send(failure_note(failed), ephemeral=True)
+    except discord.HTTPException:
+        pass  # Channel already gone; the failures are in the console log
+
+# --- HELPER: Requests posted before they were stored ---
+def parse_legacy_request(message, kind):
+    """Reads a request back from its embed footer/fields (the pre-store format). Returns the data or None."""
+    if not message.embeds:
+        return None
+    embed = message.embeds[0]
+    footer = embed.footer.text or ""
+    try:
+        if kind == "transfer":
+            # Footer Format: "Clan Channel: 12345 | New Leader: 67890"
+            parts = footer.split(" | ")
+            return {"clan_channel_id": int(parts[0].split(": ")[1]), "new_leader_id": int(parts[1].split(": ")[1])}
+        user_id = int(footer.split(": ")[1])
+    except (IndexError, ValueError):
+        return None
+    if kind == "application":
+        return {"clan_channel_id": message.channel.id, "applicant_id": user_id}
+    for field in embed.fields:
+        if field.name == "Clan Name":
+            return {"leader_id": user_id, "clan_name": field.value.replace("**", "")}
+    return None
+
+async def get_request(interaction, kind):
+    """The stored request behind a button message; requests from before the store are parsed once and stored."""
+    message = interaction.message
+    request = pending.get(message.id, kind)
+    if request is None and not pending.was_handled(message.id):
+        age = (discord.utils.utcnow() - message.created_at).total_seconds()
+        data = parse_legacy_request(message, kind) if age < PENDING_TTL else None
+        if data:
+            request = await pending.add(message.id, kind, interaction.guild_id, created_at=message.created_at.timestamp(), **data)
+    return request
 
 # ======================================================
 # 1. VIEW: CLAN CREATION (Admins)
 # ======================================================
+# (guild id, folded name) of clans being created right now
+_creating = set()
+
 class ClanCreationView(ui.View):
     def __init__(self, bot):
         super().__init__(timeout=None)
         self.bot = bot
 
-    async def get_details_from_embed(self, interaction):
-        embed = interaction.message.embeds[0]
-        try:
-            footer_text = embed.footer.text
-            leader_id = int(footer_text.split(": ")[1])
-        except:
-            leader_id = 0
-        
-        clan_name = "Unknown"
-        for field in embed.fields:
-            if field.name == "Clan Name":
-                clan_name = field.value.replace("**", "") 
-                break
-        return leader_id, clan_name
-
     @ui.button(label="✅ Approve", style=discord.ButtonStyle.green, custom_id="clan_req:approve")
     async def approve(self, interaction: discord.Interaction, button: ui.Button):
-        leader_id, clan_name = await self.get_details_from_embed(interaction)
+        request = await get_request(interaction, "creation")
+        if not request:
+            return await interaction.response.send_message(EXPIRED_MSG, ephemeral=True)
+        # Claim the request before anything else awaits, so a second click can't create the clan twice
+        await pending.remove(interaction.message.id)
+
+        leader_id, clan_name = request["leader_id"], request["clan_name"]
         guild = interaction.guild
-        
-        conf = get_config(guild.id)
+        # Another request with the same name may have been approved since this one was sent
+        name_key = (guild.id, clan_name.casefold())
+        if clans.get_by_name(guild.id, clan_name) or name_key in _creating:
+            await pending.add(interaction.message.id, **request)
+            return await interaction.response.send_message(f"❌ A clan named **{clan_name}** already exists. Reject this request.", ephemeral=True)
+        _creating.add(name_key)
+        try:
+            await self.create(interaction, request)
+        finally:
+            _creating.discard(name_key)
+
+    async def create(self, interaction, request):
+        leader_id, clan_name = request["leader_id"], request["clan_name"]
+        guild = interaction.guild
+
+        # Acknowledge right away; provisioning takes several REST calls
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        conf = await get_config(guild.id)
         cat_id = conf.get("clan_category")
         category = guild.get_channel(cat_id)
         leader = guild.get_member(leader_id)
         
         if not category:
-            return await interaction.response.send_message("❌ Clan Category not found. Run setup again.", ephemeral=True)
+            await pending.add(interaction.message.id, **request)
+            return await interaction.followup.send("❌ Clan Category not found. Run setup again.", ephemeral=True)
 
         # 1. Create Role
         try:
             clan_role = await guild.create_role(name=clan_name, reason=f"Clan Created by {interaction.user.name}")
-        except discord.Forbidden:
-            return await interaction.response.send_message("❌ I don't have permission to create roles!", ephemeral=True)
+        except discord.HTTPException:
+            await pending.add(interaction.message.id, **request)
+            return await interaction.followup.send("❌ I don't have permission to create roles!", ephemeral=True)
 
-        # 2. Create Channel
+        # 2. Create Channel + Save to DB (access comes from the clan role, not per-member overwrites)
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(read_messages=False),
             guild.me: discord.PermissionOverwrite(read_messages=True),
-            leader: discord.PermissionOverwrite(read_messages=True, send_messages=True, mention_everyone=True) if leader else None,
             clan_role: discord.PermissionOverwrite(read_messages=True, send_messages=True)
         }
+        if leader:
+            overwrites[leader] = discord.PermissionOverwrite(read_messages=True, send_messages=True, mention_everyone=True)
         
         channel_name = clan_name.lower().replace(" ", "-")
-        channel = await guild.create_text_channel(name=f"🛡️・{channel_name}", category=category, overwrites=overwrites)
-
-        # 3. Assign Role & Notify
-        if leader:
-            try:
-                await leader.add_roles(clan_role)
-            except:
-                await channel.send("⚠️ I could not give the leader the clan role (My role might be below theirs).")
-            
-            await channel.send(f"{leader.mention}, your clan **{clan_name}** is ready! 🎉\nRole: {clan_role.mention}")
-
-        # 4. Save to DB
-        clans = load_clans()
-        clans[str(channel.id)] = {
-            "name": clan_name,
-            "leader_id": leader_id,
-            "channel_id": channel.id,
-            "role_id": clan_role.id,
-            "members": [leader_id]
-        }
-        save_clans(clans)
-
-        # 5. Update Embed & Log
+        channel = None
+        try:
+            channel = await guild.create_text_channel(name=f"🛡️・{channel_name}", category=category, overwrites=overwrites)
+            await clans.create(channel.id, clan_name, leader_id, guild_id=guild.id, role_id=clan_role.id)
+        except Exception:
+            # Roll back whatever was created so a retry starts clean
+            await run_calls("Clan creation rollback", [(f"delete {obj.name}", obj.delete(reason="Clan creation failed")) for obj in (channel, clan_role) if obj])
+            await pending.add(interaction.message.id, **request)
+            await interaction.followup.send("❌ Could not create the clan channel. Nothing was kept, try again.", ephemeral=True)
+            raise
+
+        # 3. Everything else is independent: run it concurrently
         embed = interaction.message.embeds[0]
         embed.color = discord.Color.green()
         embed.title = "✅ Clan Approved"
         embed.add_field(name="Approved By", value=interaction.user.mention, inline=False)
         embed.add_field(name="Channel", value=channel.mention, inline=False)
-        
-        await interaction.message.edit(embed=embed, view=None)
-        await interaction.response.send_message(f"Created {channel.mention}", ephemeral=True)
 
-        await send_clan_log(guild, "🛡️ Clan Created", 
-            f"**Name:** {clan_name}\n**Leader:** {leader.mention if leader else 'Unknown'}\n**Approved By:** {interaction.user.mention}", 
-            discord.Color.green())
+        calls = [
+            ("update the request message", interaction.message.edit(embed=embed, view=None)),
+            ("post the clan log", send_clan_log(guild, "🛡️ Clan Created", 
+                f"**Name:** {clan_name}\n**Leader:** {leader.mention if leader else 'Unknown'}\n**Approved By:** {interaction.user.mention}", 
+                discord.Color.green()))
+        ]
+        if leader:
+            calls.append(("give the leader the clan role", leader.add_roles(clan_role)))
+            calls.append(("post the welcome message", channel.send(f"{leader.mention}, your clan **{clan_name}** is ready! 🎉\nRole: {clan_role.mention}")))
+        failed = await run_calls("Clan creation", calls)
+
+        if "give the leader the clan role" in failed:
+            await channel.send("⚠️ I could not give the leader the clan role (My role might be below theirs).")
+
+        text = f"Created {channel.mention}"
+        if failed:
+            text += "\n" + failure_note(failed)
+        await interaction.followup.send(text, ephemeral=True)
 
     @ui.button(label="❌ Reject", style=discord.ButtonStyle.red, custom_id="clan_req:reject")
     async def reject(self, interaction: discord.Interaction, button: ui.Button):
-        leader_id, clan_name = await self.get_details_from_embed(interaction)
+        request = await get_request(interaction, "creation")
+        if not request:
+            return await interaction.response.send_message(EXPIRED_MSG, ephemeral=True)
+
+        leader_id, clan_name = request["leader_id"], request["clan_name"]
+        await pending.remove(interaction.message.id)
         
         embed = interaction.message.embeds[0]
         embed.color = discord.Color.red()
@@ -134,8 +203,8 @@ class ClanCreationView(ui.View):
         if leader:
             try:
                 await leader.send(f"❌ Your request to create the clan **{clan_name}** was rejected.")
-            except:
-                pass
+            except discord.HTTPException:
+                pass # DM closed
 
         await interaction.message.edit(embed=embed, view=None)
         await interaction.response.send_message("Request rejected.", ephemeral=True)
@@ -154,67 +223,69 @@ class MemberApplicationView(ui.View):
 
     @ui.button(label="✅ Accept", style=discord.ButtonStyle.green, custom_id="clan_app:accept")
     async def accept(self, interaction: discord.Interaction, button: ui.Button):
-        clans = load_clans()
-        clan_data = clans.get(str(interaction.channel_id))
+        request = await get_request(interaction, "application")
+        if not request:
+            return await interaction.response.send_message(EXPIRED_MSG, ephemeral=True)
+
+        clan = clans.get(request["clan_channel_id"])
         
-        if not clan_data:
+        if not clan:
             return await interaction.response.send_message("❌ Error: Clan data not found.", ephemeral=True)
 
-        if interaction.user.id != clan_data["leader_id"] and not interaction.user.guild_permissions.administrator:
+        if interaction.user.id != clan.leader_id and not interaction.user.guild_permissions.administrator:
             return await interaction.response.send_message("Only the Clan Leader can accept members!", ephemeral=True)
 
-        embed = interaction.message.embeds[0]
-        try:
-            applicant_id = int(embed.footer.text.split(": ")[1])
-            applicant = interaction.guild.get_member(applicant_id)
-        except:
-            applicant = None
+        # Acknowledge the click; the message is deleted at the end
+        await interaction.response.defer()
+        await pending.remove(interaction.message.id)
+        applicant = interaction.guild.get_member(request["applicant_id"])
 
         if applicant:
-            await interaction.channel.set_permissions(applicant, read_messages=True, send_messages=True)
-            
-            role_id = clan_data.get("role_id")
-            if role_id:
-                role = interaction.guild.get_role(role_id)
-                if role:
-                    try:
-                        await applicant.add_roles(role)
-                    except:
-                        pass
-
-            await interaction.channel.send(f"Welcome {applicant.mention} to **{clan_data['name']}**! 🎉")
-            
-            if applicant.id not in clan_data["members"]:
-                clan_data["members"].append(applicant.id)
-                save_clans(clans)
+            await clans.add_member(clan, applicant.id)
 
-            await send_clan_log(interaction.guild, "👤 Member Joined Clan", 
-                f"**User:** {applicant.mention}\n**Clan:** {clan_data['name']}\n**Accepted By:** {interaction.user.mention}", 
-                discord.Color.blue())
+            # Channel access comes from the clan role; only fall back to a
+            # member overwrite if the role is gone
+            role = interaction.guild.get_role(clan.role_id) if clan.role_id else None
+            if role:
+                grant = ("give the new member the clan role", applicant.add_roles(role))
+            else:
+                grant = ("open the clan channel to the new member", interaction.channel.set_permissions(applicant, read_messages=True, send_messages=True))
+
+            failed = await run_calls("Clan accept", [
+                grant,
+                ("post the welcome message", interaction.channel.send(f"Welcome {applicant.mention} to **{clan.name}**! 🎉")),
+                ("post the clan log", send_clan_log(interaction.guild, "👤 Member Joined Clan", 
+                    f"**User:** {applicant.mention}\n**Clan:** {clan.name}\n**Accepted By:** {interaction.user.mention}", 
+                    discord.Color.blue())),
+                ("delete the application", interaction.message.delete())
+            ])
         else:
-            await interaction.channel.send("User left the server or cannot be found.")
-
-        await interaction.message.delete()
+            failed = await run_calls("Clan accept", [
+                ("post the notice", interaction.channel.send("User left the server or cannot be found.")),
+                ("delete the application", interaction.message.delete())
+            ])
+        await report_failures(interaction, failed)
 
     @ui.button(label="❌ Deny", style=discord.ButtonStyle.red, custom_id="clan_app:deny")
     async def deny(self, interaction: discord.Interaction, button: ui.Button):
-        clans = load_clans()
-        clan_data = clans.get(str(interaction.channel_id))
+        request = await get_request(interaction, "application")
+        if not request:
+            return await interaction.response.send_message(EXPIRED_MSG, ephemeral=True)
+
+        clan = clans.get(request["clan_channel_id"])
+        if not clan:
+            return await interaction.response.send_message("❌ Error: Clan data not found.", ephemeral=True)
         
-        if interaction.user.id != clan_data["leader_id"] and not interaction.user.guild_permissions.administrator:
+        if interaction.user.id != clan.leader_id and not interaction.user.guild_permissions.administrator:
             return await interaction.response.send_message("Only the Clan Leader can deny members!", ephemeral=True)
 
-        embed = interaction.message.embeds[0]
-        try:
-            applicant_id = int(embed.footer.text.split(": ")[1])
-            applicant = interaction.guild.get_member(applicant_id)
-            if applicant:
-                try:
-                    await applicant.send(f"❌ Your application to join **{clan_data['name']}** was denied.")
-                except:
-                    pass
-        except:
-            pass
+        await pending.remove(interaction.message.id)
+        applicant = interaction.guild.get_member(request["applicant_id"])
+        if applicant:
+            try:
+                await applicant.send(f"❌ Your application to join **{clan.name}** was denied.")
+            except discord.HTTPException:
+                pass # DM closed
 
         await interaction.message.delete()
         await interaction.response.send_message("Application denied.", ephemeral=True)
@@ -227,58 +298,62 @@ class ClanTransferView(ui.View):
         super().__init__(timeout=None)
         self.bot = bot
 
-    async def get_transfer_details(self, interaction):
-        embed = interaction.message.embeds[0]
-        # Footer Format: "Clan Channel: 12345 | New Leader: 67890"
-        parts = embed.footer.text.split(" | ")
-        channel_id = str(parts[0].split(": ")[1])
-        new_leader_id = int(parts[1].split(": ")[1])
-        return channel_id, new_leader_id
-
     @ui.button(label="✅ Approve Transfer", style=discord.ButtonStyle.green, custom_id="clan_transfer:approve")
     async def approve(self, interaction: discord.Interaction, button: ui.Button):
-        channel_id_str, new_leader_id = await self.get_transfer_details(interaction)
-        clans = load_clans()
+        request = await get_request(interaction, "transfer")
+        if not request:
+            return await interaction.response.send_message(EXPIRED_MSG, ephemeral=True)
+
+        new_leader_id = request["new_leader_id"]
+        clan = clans.get(request["clan_channel_id"])
         
-        if channel_id_str not in clans:
+        if not clan:
+            await pending.remove(interaction.message.id)
             return await interaction.response.send_message("❌ Clan not found (Channel might be deleted).", ephemeral=True)
 
-        clan_data = clans[channel_id_str]
         guild = interaction.guild
         
         new_leader = guild.get_member(new_leader_id)
-        old_leader = guild.get_member(clan_data["leader_id"])
-        clan_channel = guild.get_channel(int(channel_id_str))
+        old_leader = guild.get_member(clan.leader_id)
+        clan_channel = guild.get_channel(clan.channel_id)
 
         if not new_leader:
             return await interaction.response.send_message("❌ New leader has left the server.", ephemeral=True)
 
-        # 1. Update Permissions
-        if clan_channel:
-            if old_leader:
-                await clan_channel.set_permissions(old_leader, read_messages=True, send_messages=True, mention_everyone=False)
-            await clan_channel.set_permissions(new_leader, read_messages=True, send_messages=True, mention_everyone=True)
-            await clan_channel.send(f"👑 **Ownership Transferred!**\n{new_leader.mention} is now the Leader.")
+        await interaction.response.defer(ephemeral=True, thinking=True)
 
-        # 2. Update DB
-        clan_data["leader_id"] = new_leader_id
-        save_clans(clans)
+        # 1. Update DB
+        await clans.set_leader(clan, new_leader_id)
+        await pending.remove(interaction.message.id)
 
-        # 3. Update Admin Log
+        # 2. Permissions, announcement, admin log: independent calls, run together
         embed = interaction.message.embeds[0]
         embed.color = discord.Color.green()
         embed.title = "✅ Transfer Approved"
         embed.add_field(name="Approved By", value=interaction.user.mention, inline=False)
-        await interaction.message.edit(embed=embed, view=None)
-        
-        await interaction.response.send_message("Ownership transferred.", ephemeral=True)
 
-        await send_clan_log(guild, "👑 Ownership Transferred", 
-            f"**Clan:** {clan_data['name']}\n**Old Leader:** {old_leader.mention if old_leader else 'Unknown'}\n**New Leader:** {new_leader.mention}", 
-            discord.Color.gold())
+        calls = [
+            ("update the request message", interaction.message.edit(embed=embed, view=None)),
+            ("post the clan log", send_clan_log(guild, "👑 Ownership Transferred", 
+                f"**Clan:** {clan.name}\n**Old Leader:** {old_leader.mention if old_leader else 'Unknown'}\n**New Leader:** {new_leader.mention}", 
+                discord.Color.gold()))
+        ]
+        if clan_channel:
+            # Only the leader keeps a member overwrite (for @everyone pings)
+            if old_leader and old_leader in clan_channel.overwrites:
+                calls.append(("remove the old leader's channel permissions", clan_channel.set_permissions(old_leader, overwrite=None)))
+            calls.append(("give the new leader channel permissions", clan_channel.set_permissions(new_leader, read_messages=True, send_messages=True, mention_everyone=True)))
+            calls.append(("post the announcement", clan_channel.send(f"👑 **Ownership Transferred!**\n{new_leader.mention} is now the Leader.")))
+        failed = await run_calls("Clan transfer", calls)
+
+        text = "Ownership transferred."
+        if failed:
+            text += "\n" + failure_note(failed)
+        await interaction.followup.send(text, ephemeral=True)
 
     @ui.button(label="❌ Reject Transfer", style=discord.ButtonStyle.red, custom_id="clan_transfer:reject")
     async def reject(self, interaction: discord.Interaction, button: ui.Button):
+        await pending.remove(interaction.message.id)
         embed = interaction.message.embeds[0]
         embed.color = discord.Color.red()
         embed.title = "❌ Transfer Rejected"
@@ -296,16 +371,47 @@ class ClanSystem(commands.Cog):
         self.bot.add_view(ClanCreationView(bot))
         self.bot.add_view(MemberApplicationView())
         self.bot.add_view(ClanTransferView(bot))
+        # (guild id or None, page) -> (ranking version, embed)
+        self.leaderboard_cache = {}
+
+    async def cog_load(self):
+        await clans.load()
+        await pending.load()
+        self.expire_pending_task.start()
+
+    def cog_unload(self):
+        self.expire_pending_task.cancel()
+
+    @tasks.loop(hours=1)
+    async def expire_pending_task(self):
+        removed = await pending.expire()
+        if removed:
+            print(f"[Clans] Dropped {removed} expired pending request(s)")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Clans created before guild ids were stored: fill them in from the channel
+        for clan in list(clans.all()):
+            if clan.guild_id is None:
+                channel = self.bot.get_channel(clan.channel_id)
+                if channel:
+                    await clans.set_guild(clan, channel.guild.id)
+
+    # --- HELPER: Calls that take a member's clan access away ---
+    def revoke_access(self, channel, member, clan):
+        calls = []
+        role = channel.guild.get_role(clan.role_id) if clan.role_id else None
+        if role:
+            calls.append((f"remove the clan role from {member.display_name}", member.remove_roles(role)))
+        # Older clans granted access with member overwrites; only touch one if it exists
+        if member in channel.overwrites:
+            calls.append((f"remove {member.display_name}'s channel permissions", channel.set_permissions(member, overwrite=None)))
+        return calls
 
     # --- AUTOCOMPLETE ---
     async def clan_name_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
-        clans = load_clans()
-        choices = []
-        for data in clans.values():
-            name = data["name"]
-            if current.lower() in name.lower():
-                choices.append(app_commands.Choice(name=name, value=name))
-        return choices[:25]
+        # Only this server's clans, from the pre-built search index
+        return [app_commands.Choice(name=clan.name, value=clan.name) for clan in clans.search(interaction.guild_id, current)]
 
     # --- SETUP ---
     @app_commands.command(name="setup_clan_system", description="Auto-create categories and channels")
@@ -324,10 +430,11 @@ class ClanSystem(commands.Cog):
         log_channel = await guild.create_text_channel("qh・clan-logs", category=admin_cat, overwrites=overwrites)
         clan_cat = await guild.create_category("🛡️ Clans")
 
-        update_config(guild.id, "clan_leader_role", leader_role.id)
-        update_config(guild.id, "clan_approve_channel", approve_channel.id)
-        update_config(guild.id, "clan_log_channel", log_channel.id)
-        update_config(guild.id, "clan_category", clan_cat.id)
+        async with transaction(guild.id) as conf:
+            conf["clan_leader_role"] = leader_role.id
+            conf["clan_approve_channel"] = approve_channel.id
+            conf["clan_log_channel"] = log_channel.id
+            conf["clan_category"] = clan_cat.id
 
         embed = discord.Embed(title="✅ Clan System Setup Complete", color=0x2ecc71)
         embed.add_field(name="Leader Role", value=leader_role.mention)
@@ -338,7 +445,7 @@ class ClanSystem(commands.Cog):
     # --- CREATE ---
     @app_commands.command(name="create_clan", description="Request to create a new clan")
     async def create_clan(self, interaction: discord.Interaction, name: str, description: str):
-        conf = get_config(interaction.guild_id)
+        conf = await get_config(interaction.guild_id)
         role_id = conf.get("clan_leader_role")
         
         if not role_id: 
@@ -348,6 +455,9 @@ class ClanSystem(commands.Cog):
         if role not in interaction.user.roles:
             return await interaction.response.send_message(f"❌ You need the {role.mention} role to create a clan.", ephemeral=True)
 
+        if clans.get_by_name(interaction.guild_id, name):
+            return await interaction.response.send_message(f"❌ A clan named **{name}** already exists.", ephemeral=True)
+
         approve_channel_id = conf.get("clan_approve_channel")
         channel = interaction.guild.get_channel(approve_channel_id)
 
@@ -358,27 +468,23 @@ class ClanSystem(commands.Cog):
         embed.add_field(name="📝 Description", value=description, inline=False)
         embed.set_footer(text=f"Leader ID: {interaction.user.id}")
 
-        await channel.send(embed=embed, view=ClanCreationView(self.bot))
+        msg = await channel.send(embed=embed, view=ClanCreationView(self.bot))
+        await pending.add(msg.id, "creation", interaction.guild_id, leader_id=interaction.user.id, clan_name=name)
         await interaction.response.send_message("✅ Request Sent!", ephemeral=True)
 
     # --- APPLY ---
     @app_commands.command(name="apply_clan", description="Apply to join a specific clan")
     @app_commands.autocomplete(clan_name=clan_name_autocomplete)
     async def apply_clan(self, interaction: discord.Interaction, clan_name: str, message: str):
-        clans = load_clans()
-        target_clan = None
-        for data in clans.values():
-            if data["name"].lower() == clan_name.lower():
-                target_clan = data
-                break
+        target_clan = clans.get_by_name(interaction.guild_id, clan_name)
         
         if not target_clan: 
             return await interaction.response.send_message("❌ Clan not found.", ephemeral=True)
         
-        if interaction.user.id in target_clan["members"]: 
+        if interaction.user.id in target_clan.members: 
             return await interaction.response.send_message("❌ You are already in this clan.", ephemeral=True)
 
-        clan_channel = interaction.guild.get_channel(target_clan["channel_id"])
+        clan_channel = interaction.guild.get_channel(target_clan.channel_id)
         
         if not clan_channel:
             return await interaction.response.send_message(f"❌ Channel for **{clan_name}** deleted.", ephemeral=True)
@@ -389,87 +495,73 @@ class ClanSystem(commands.Cog):
         embed.add_field(name="Message", value=message, inline=False)
         embed.set_footer(text=f"Applicant ID: {interaction.user.id}")
         
-        await clan_channel.send(content=f"<@{target_clan['leader_id']}>", embed=embed, view=MemberApplicationView())
+        msg = await clan_channel.send(content=f"<@{target_clan.leader_id}>", embed=embed, view=MemberApplicationView())
+        await pending.add(msg.id, "application", interaction.guild_id, clan_channel_id=target_clan.channel_id, applicant_id=interaction.user.id)
         await interaction.response.send_message(f"✅ Application sent to **{clan_name}**!", ephemeral=True)
 
     # --- LEAVE ---
     @app_commands.command(name="leave_clan", description="Leave your current clan")
     async def leave_clan(self, interaction: discord.Interaction):
-        clans = load_clans()
-        channel_id_str = str(interaction.channel_id)
-        if channel_id_str not in clans: 
+        clan = clans.get(interaction.channel_id)
+        if not clan: 
             return await interaction.response.send_message("❌ Run this inside your clan channel.", ephemeral=True)
 
-        clan_data = clans[channel_id_str]
-        if interaction.user.id == clan_data["leader_id"]: 
+        if interaction.user.id == clan.leader_id: 
             return await interaction.response.send_message("❌ Leaders cannot leave. Use `/disband_clan` or `/transfer_ownership`.", ephemeral=True)
 
-        await interaction.channel.set_permissions(interaction.user, overwrite=None)
-        
-        role_id = clan_data.get("role_id")
-        if role_id:
-            role = interaction.guild.get_role(role_id)
-            if role: 
-                try: await interaction.user.remove_roles(role)
-                except: pass
-
-        clan_data["members"].remove(interaction.user.id)
-        save_clans(clans)
-        await interaction.response.send_message(f"{interaction.user.mention} left the clan.", ephemeral=False)
+        await clans.remove_member(clan, interaction.user.id)
 
-        await send_clan_log(interaction.guild, "🚪 Member Left Clan", 
-            f"**User:** {interaction.user.mention}\n**Clan:** {clan_data['name']}", 
-            discord.Color.orange())
+        failed = await run_calls("Clan leave", [
+            *self.revoke_access(interaction.channel, interaction.user, clan),
+            ("reply", interaction.response.send_message(f"{interaction.user.mention} left the clan.", ephemeral=False)),
+            ("post the clan log", send_clan_log(interaction.guild, "🚪 Member Left Clan", 
+                f"**User:** {interaction.user.mention}\n**Clan:** {clan.name}", 
+                discord.Color.orange()))
+        ])
+        await report_failures(interaction, failed)
 
     # --- DISBAND ---
     @app_commands.command(name="disband_clan", description="⚠️ Delete your clan permanently (Leader Only)")
     async def disband_clan(self, interaction: discord.Interaction):
-        clans = load_clans()
-        channel_id_str = str(interaction.channel_id)
+        clan = clans.get(interaction.channel_id)
         
-        if channel_id_str not in clans:
+        if not clan:
             return await interaction.response.send_message("❌ Run this inside your clan channel.", ephemeral=True)
-            
-        clan_data = clans[channel_id_str]
         
-        if interaction.user.id != clan_data["leader_id"] and not interaction.user.guild_permissions.administrator:
+        if interaction.user.id != clan.leader_id and not interaction.user.guild_permissions.administrator:
             return await interaction.response.send_message("❌ Only the **Clan Leader** can disband the clan.", ephemeral=True)
 
         await interaction.response.send_message("⚠️ Disbanding clan... Goodbye!", ephemeral=True)
-
-        role_id = clan_data.get("role_id")
-        if role_id:
-            role = interaction.guild.get_role(role_id)
-            if role:
-                try: await role.delete(reason="Clan Disbanded")
-                except: pass 
-
-        await send_clan_log(interaction.guild, "🗑️ Clan Disbanded", 
-            f"**Clan:** {clan_data['name']}\n**Action By:** {interaction.user.mention}", 
-            discord.Color.dark_red())
-
-        del clans[channel_id_str]
-        save_clans(clans)
-        await interaction.channel.delete(reason="Clan Disbanded")
+        await clans.delete(clan)
+
+        role = interaction.guild.get_role(clan.role_id) if clan.role_id else None
+        calls = [
+            ("post the clan log", send_clan_log(interaction.guild, "🗑️ Clan Disbanded", 
+                f"**Clan:** {clan.name}\n**Action By:** {interaction.user.mention}", 
+                discord.Color.dark_red())),
+            ("delete the clan channel", interaction.channel.delete(reason="Clan Disbanded"))
+        ]
+        if role:
+            calls.append(("delete the clan role", role.delete(reason="Clan Disbanded")))
+        # The clan is gone from the database either way; leftovers have to be removed by hand
+        await report_failures(interaction, await run_calls("Clan disband", calls))
 
     # --- TRANSFER ---
     @app_commands.command(name="transfer_ownership", description="Transfer leadership to another member")
     @app_commands.describe(new_leader="The member to make the new Leader")
     async def transfer_ownership(self, interaction: discord.Interaction, new_leader: discord.Member):
-        clans = load_clans()
-        channel_id_str = str(interaction.channel_id)
+        clan = clans.get(interaction.channel_id)
 
-        if channel_id_str not in clans: return await interaction.response.send_message("❌ Run this inside your clan channel.", ephemeral=True)
-        clan_data = clans[channel_id_str]
+        if not clan: return await interaction.response.send_message("❌ Run this inside your clan channel.", ephemeral=True)
 
-        if interaction.user.id != clan_data["leader_id"]:
+        if interaction.user.id != clan.leader_id:
             return await interaction.response.send_message("❌ Only the **Clan Leader** can transfer ownership.", ephemeral=True)
 
-        if new_leader.id not in clan_data["members"]:
+        if new_leader.id not in clan.members:
             return await interaction.response.send_message("❌ The new leader must be a member of this clan first!", ephemeral=True)
 
         # Send Request to Admin
-        conf = get_config(interaction.guild_id)
+        conf = await get_config(interaction.guild_id)
         approve_id = conf.get("clan_approve_channel")
         approve_channel = interaction.guild.get_channel(approve_id)
 
@@ -477,101 +569,86 @@ class ClanSystem(commands.Cog):
              return await interaction.response.send_message("❌ Admin approval channel not found.", ephemeral=True)
 
         embed = discord.Embed(title="👑 Ownership Transfer Request", color=0xf1c40f)
-        embed.add_field(name="Clan Name", value=f"**{clan_data['name']}**", inline=True)
+        embed.add_field(name="Clan Name", value=f"**{clan.name}**", inline=True)
         embed.add_field(name="Current Leader", value=interaction.user.mention, inline=True)
         embed.add_field(name="New Leader", value=new_leader.mention, inline=True)
         
-        embed.set_footer(text=f"Clan Channel: {channel_id_str} | New Leader: {new_leader.id}")
+        embed.set_footer(text=f"Clan Channel: {clan.channel_id} | New Leader: {new_leader.id}")
 
-        await approve_channel.send(embed=embed, view=ClanTransferView(self.bot))
+        msg = await approve_channel.send(embed=embed, view=ClanTransferView(self.bot))
+        await pending.add(msg.id, "transfer", interaction.guild_id, clan_channel_id=clan.channel_id, new_leader_id=new_leader.id)
         await interaction.response.send_message("✅ **Transfer Request Sent!** Admins will review it soon.", ephemeral=True)
 
     # --- KICK ---
     @app_commands.command(name="clan_kick", description="Kick a member from the clan (Leader Only)")
     @app_commands.describe(member="The member to kick", reason="Reason for kicking")
     async def clan_kick(self, interaction: discord.Interaction, member: discord.Member, reason: str):
-        clans = load_clans()
-        channel_id_str = str(interaction.channel_id)
+        clan = clans.get(interaction.channel_id)
 
-        if channel_id_str not in clans:
+        if not clan:
             return await interaction.response.send_message("❌ Run this inside your clan channel.", ephemeral=True)
         
-        clan_data = clans[channel_id_str]
-        
-        if interaction.user.id != clan_data["leader_id"]:
+        if interaction.user.id != clan.leader_id:
             return await interaction.response.send_message("❌ Only the **Leader** can kick members.", ephemeral=True)
 
         if member.id == interaction.user.id:
             return await interaction.response.send_message("❌ You cannot kick yourself.", ephemeral=True)
 
-        if member.id not in clan_data["members"]:
+        if member.id not in clan.members:
             return await interaction.response.send_message("❌ That user is not in your clan.", ephemeral=True)
 
-        await interaction.channel.set_permissions(member, overwrite=None)
-        
-        role_id = clan_data.get("role_id")
-        if role_id:
-            role = interaction.guild.get_role(role_id)
-            if role: 
-                try: await member.remove_roles(role)
-                except: pass
-
-        clan_data["members"].remove(member.id)
-        save_clans(clans)
+        await clans.remove_member(clan, member.id)
 
-        await interaction.response.send_message(f"👢 **{member.display_name}** has been kicked from the clan.\n**Reason:** {reason}")
-
-        await send_clan_log(interaction.guild, "👢 Member Kicked", 
-            f"**Clan:** {clan_data['name']}\n**Kicked:** {member.mention}\n**By:** {interaction.user.mention}\n**Reason:** {reason}", 
-            discord.Color.red())
+        failed = await run_calls("Clan kick", [
+            *self.revoke_access(interaction.channel, member, clan),
+            ("reply", interaction.response.send_message(f"👢 **{member.display_name}** has been kicked from the clan.\n**Reason:** {reason}")),
+            ("post the clan log", send_clan_log(interaction.guild, "👢 Member Kicked", 
+                f"**Clan:** {clan.name}\n**Kicked:** {member.mention}\n**By:** {interaction.user.mention}\n**Reason:** {reason}", 
+                discord.Color.red()))
+        ])
+        await report_failures(interaction, failed)
 
     # --- CLAN INFO ---
     @app_commands.command(name="clan_info", description="View details about the current clan")
     async def clan_info(self, interaction: discord.Interaction):
-        clans = load_clans()
-        channel_id_str = str(interaction.channel_id)
+        clan = clans.get(interaction.channel_id)
 
-        if channel_id_str not in clans:
+        if not clan:
             return await interaction.response.send_message("❌ This is not a clan channel.", ephemeral=True)
 
-        clan_data = clans[channel_id_str]
-        leader = interaction.guild.get_member(clan_data["leader_id"])
+        leader = interaction.guild.get_member(clan.leader_id)
         
         member_names = []
-        for uid in clan_data["members"]:
+        for uid in clan.members:
             mem = interaction.guild.get_member(uid)
             if mem: member_names.append(mem.display_name)
             else: member_names.append(f"Unknown ({uid})")
 
-        embed = discord.Embed(title=f"🛡️ Clan: {clan_data['name']}", color=0x3498db)
+        embed = discord.Embed(title=f"🛡️ Clan: {clan.name}", color=0x3498db)
         embed.set_thumbnail(url=leader.display_avatar.url if leader else None)
         embed.add_field(name="👑 Leader", value=leader.mention if leader else "Unknown", inline=True)
-        embed.add_field(name="👥 Members", value=f"{len(clan_data['members'])}", inline=True)
+        embed.add_field(name="👥 Members", value=f"{len(clan.members)}", inline=True)
         embed.add_field(name="📜 Member List", value=", ".join(member_names) if member_names else "None", inline=False)
 
         await interaction.response.send_message(embed=embed)
 
     # --- UPDATED: CLAN LIST (With Server Name) ---
-    @app_commands.command(name="clan_list", description="View the top 10 clans globally")
-    async def clan_list(self, interaction: discord.Interaction):
-        clans = load_clans()
-        
-        if not clans:
-            return await interaction.response.send_message("❌ No clans have been created yet.", ephemeral=True)
-        
-        # Sort clans by number of members (descending)
-        sorted_clans = sorted(clans.values(), key=lambda x: len(x['members']), reverse=True)
-        
+    def build_leaderboard_embed(self, guild, page):
+        guild_id = guild.id if guild else None
+        total = clans.leaderboard_size(guild_id)
+        pages = max(1, -(-total // LEADERBOARD_PAGE_SIZE))
+        page = min(page, pages - 1)
+
         description = ""
-        for i, clan_data in enumerate(sorted_clans[:10], 1):
+        for i, clan in enumerate(clans.leaderboard(guild_id, page, LEADERBOARD_PAGE_SIZE), page * LEADERBOARD_PAGE_SIZE + 1):
             # 1. Get Leader Name
-            leader_id = clan_data["leader_id"]
+            leader_id = clan.leader_id
             leader = self.bot.get_user(leader_id)
             leader_name = leader.name if leader else f"User:{leader_id}"
             
             # 2. Get Server Name
             # We find the server by looking up the Clan Channel
-            channel_id = clan_data["channel_id"]
+            channel_id = clan.channel_id
             channel = self.bot.get_channel(channel_id)
             
             if channel:
@@ -582,13 +659,42 @@ class ClanSystem(commands.Cog):
 
             # 3. Format the Entry
             description += (
-                f"**{i}. {clan_data['name']}**\n"
+                f"**{i}. {clan.name}**\n"
                 f"👑 Leader: `{leader_name}`\n"
                 f"🏠 Server: `{server_name}`\n"
-                f"👥 Members: **{len(clan_data['members'])}**\n\n"
+                f"👥 Members: **{len(clan.members)}**\n\n"
             )
         
-        embed = discord.Embed(title="🏆 Global Clan Leaderboard", description=description, color=discord.Color.gold())
+        title = f"🏆 {guild.name} Clan Leaderboard" if guild else "🏆 Global Clan Leaderboard"
+        embed = discord.Embed(title=title, description=description, color=discord.Color.gold())
+        embed.set_footer(text=f"Page {page + 1}/{pages} • {total} clans")
+        return embed
+
+    @app_commands.command(name="clan_list", description="View the clan leaderboard")
+    @app_commands.describe(scope="All servers or only this one", page="Page number")
+    @app_commands.choices(scope=[
+        app_commands.Choice(name="Global", value="global"),
+        app_commands.Choice(name="This Server", value="server")
+    ])
+    async def clan_list(self, interaction: discord.Interaction, scope: app_commands.Choice[str] = None, page: int = 1):
+        guild = interaction.guild if scope and scope.value == "server" else None
+        guild_id = guild.id if guild else None
+
+        if not clans.leaderboard_size(guild_id):
+            return await interaction.response.send_message("❌ No clans have been created yet.", ephemeral=True)
+
+        # Rendered pages are reused until the ranking changes
+        key = (guild_id, max(page, 1) - 1)
+        version = clans.ranking_version(guild_id)
+        cached = self.leaderboard_cache.get(key)
+        if cached and cached[0] == version:
+            embed = cached[1]
+        else:
+            if len(self.leaderboard_cache) >= 256:
+                self.leaderboard_cache.clear()
+            embed = self.build_leaderboard_embed(guild, key[1])
+            self.leaderboard_cache[key] = (version, embed)
+
         await interaction.response.send_message(embed=embed)
 
 async def setup(bot):
@@ -30,6 +30,8 @@ class HelpSelect(ui.Select):
             embed.description = "Commands for server management."
             embed.add_field(name="/setup logs", value="Configure log channels", inline=False)
             embed.add_field(name="/setup stream", value="Configure streamer alerts", inline=False)
+            embed.add_field(name="/mass kick | ban | timeout", value="Moderate a member list, a role, or recent joins at once", inline=False)
+            embed.add_field(name="/raid", value="Show a join raid and timeout/kick/ban everyone in it", inline=False)
             embed.add_field(name="/setup_clan_system", value="Initialize Clan Categories", inline=False)
             embed.add_field(name="/owner status", value="Change Bot Presence", inline=False)
             embed.add_field(name="/owner backup", value="Backup Clan Database", inline=False)
@@ -1,16 +1,38 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import datetime
 import config
 from utils.database import get_config
+from utils.log_dispatcher import dispatcher
+from utils.outbound import HIGH, LOW
+from utils.audit_cache import audit_log
+from utils.message_cache import snapshots, MessageSnapshot
+from utils import transcript as transcripts
+from utils import features
+from utils.features import Feature
+from utils.voice_store import voice
+from utils.raid import raids
 
 class Logging(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.voice_sessions = {}
 
-    def get_log_channel(self, guild, key):
-        data = get_config(guild.id)
+    async def cog_load(self):
+        # Audit events only arrive with the moderation intent; otherwise lookups use REST
+        audit_log.enabled = self.bot.intents.moderation
+        await voice.load()
+        # Reloaded while running: on_ready won't fire again to reopen voice sessions
+        if self.bot.is_ready():
+            for guild in self.bot.guilds:
+                await voice.rebuild(guild)
+
+    async def cog_unload(self):
+        # Count open voice sessions into the totals; the shutdown flush (or write-behind) saves them
+        await voice.close_all()
+
+    async def get_log_channel(self, guild, key):
+        data = await get_config(guild.id)
         channel_id = data.get(key)
         if not channel_id:
             channel_id = data.get("log_channel")
@@ -35,12 +57,20 @@ class Logging(commands.Cog):
         if minutes > 0: return f"{minutes} minutes"
         return f"{secs} seconds"
 
+    def format_duration(self, total_seconds):
+        hours, remainder = divmod(int(total_seconds), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        return f"{hours}h {minutes}m {seconds}s"
+
     # ====================================================
     # 1. JOIN LOGS
     # ====================================================
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        channel = self.get_log_channel(member.guild, "log_join_id")
+        # During a raid the Raid cog posts periodic summaries instead
+        if raids.record_join(member): return
+        if not features.enabled(member.guild.id, Feature.LOG_JOIN): return
+        channel = await self.get_log_channel(member.guild, "log_join_id")
         if channel:
             embed = discord.Embed(
                 description=f"Welcome {member.mention} to **{member.guild.name}**!", 
@@ -55,7 +85,7 @@ class Logging(commands.Cog):
             
             embed.set_thumbnail(url=member.display_avatar.url)
             embed.set_footer(text=f"Member Count: {member.guild.member_count} | User ID: {member.id}")
-            await channel.send(embed=embed)
+            dispatcher.queue(channel, embed, "log.join")
 
     # ====================================================
     # 2. LEAVE & KICK LOGS
@@ -63,37 +93,27 @@ class Logging(commands.Cog):
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         guild = member.guild
+        if not features.enabled(guild.id, Feature.LOG_LEAVE | Feature.LOG_MOD): return
         now = discord.utils.utcnow()
-        is_kick = False
-        kicker = None
-        reason = "No reason provided"
-
-        if guild.me.guild_permissions.view_audit_log:
-            async for entry in guild.audit_logs(limit=1, action=discord.AuditLogAction.kick):
-                if entry.target.id == member.id:
-                    if (now - entry.created_at).total_seconds() < 10:
-                        is_kick = True
-                        kicker = entry.user
-                        reason = entry.reason
-                    break
-        
-        if is_kick:
-            channel = self.get_log_channel(guild, "log_mod_id")
-            if channel:
-                # Uses config.EMOJIS['boot'] if you have one, or a fallback emoji
-                boot_emoji = config.EMOJIS.get('boot', '👢')
-                embed = discord.Embed(
-                    title=f"{boot_emoji} Member Kicked", 
-                    color=discord.Color.red(),
-                    timestamp=now
-                )
-                embed.add_field(name="User", value=member.mention, inline=False)
-                embed.add_field(name="Moderator", value=kicker.mention if kicker else "Unknown", inline=True)
-                embed.add_field(name="Reason", value=reason, inline=False)
-                embed.set_footer(text=f"User ID: {member.id}")
-                await channel.send(embed=embed)
+        # Only wait for the kick's audit entry if there is a mod log to post it to
+        mod_channel = await self.get_log_channel(guild, "log_mod_id")
+        kick = mod_channel and await audit_log.find(guild, discord.AuditLogAction.kick, member.id, max_age=10)
+
+        if kick:
+            # Uses config.EMOJIS['boot'] if you have one, or a fallback emoji
+            boot_emoji = config.EMOJIS.get('boot', '👢')
+            embed = discord.Embed(
+                title=f"{boot_emoji} Member Kicked", 
+                color=discord.Color.red(),
+                timestamp=now
+            )
+            embed.add_field(name="User", value=member.mention, inline=False)
+            embed.add_field(name="Moderator", value=kick.moderator, inline=True)
+            embed.add_field(name="Reason", value=kick.reason or "No reason provided", inline=False)
+            embed.set_footer(text=f"User ID: {member.id}")
+            dispatcher.queue(mod_channel, embed, "log.mod", HIGH)
         else:
-            channel = self.get_log_channel(guild, "log_leave_id")
+            channel = await self.get_log_channel(guild, "log_leave_id")
             if channel:
                 time_stayed = self.format_time_ago(member.joined_at)
                 roles = [r.mention for r in member.roles if r.name != "@everyone"]
@@ -108,21 +128,31 @@ class Logging(commands.Cog):
                 embed.set_author(name="Member left", icon_url=member.display_avatar.url)
                 embed.add_field(name="Roles:", value=roles_str, inline=False)
                 embed.set_footer(text=f"ID: {member.id}")
-                await channel.send(embed=embed)
+                dispatcher.queue(channel, embed, "log.leave")
 
     # ====================================================
     # 3. VOICE LOGS (Now using Animated Emojis)
     # ====================================================
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
-        channel = self.get_log_channel(member.guild, "log_voice_id")
+        now = discord.utils.utcnow()
+        guild_id = member.guild.id
+
+        # Voice time is tracked even when voice logs are off
+        duration = None
+        if before.channel is None and after.channel is not None:
+            voice.join(guild_id, member.id, after.channel.id, now)
+        elif before.channel is not None and after.channel is None:
+            duration = await voice.leave(guild_id, member.id, now)
+        elif before.channel is not None and after.channel is not None and before.channel != after.channel:
+            await voice.move(guild_id, member.id, after.channel.id, now)
+
+        if not features.enabled(guild_id, Feature.LOG_VOICE): return
+        channel = await self.get_log_channel(member.guild, "log_voice_id")
         if not channel: return
-        
-        now = datetime.datetime.now()
 
         # JOIN
         if before.channel is None and after.channel is not None:
-            self.voice_sessions[member.id] = now
             emoji = config.EMOJIS.get("voice_join", "🎤")
             
             embed = discord.Embed(
@@ -133,18 +163,11 @@ class Logging(commands.Cog):
             embed.set_author(name="Voice Join", icon_url=member.display_avatar.url)
             embed.set_thumbnail(url=member.display_avatar.url)
             embed.set_footer(text=f"ID: {member.id}")
-            await channel.send(embed=embed)
+            dispatcher.queue(channel, embed, "log.voice", LOW)
 
         # LEAVE
         elif before.channel is not None and after.channel is None:
-            duration_str = "0s"
-            if member.id in self.voice_sessions:
-                start_time = self.voice_sessions.pop(member.id)
-                duration = now - start_time
-                total_seconds = int(duration.total_seconds())
-                hours, remainder = divmod(total_seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                duration_str = f"{hours}h {minutes}m {seconds}s"
+            duration_str = self.format_duration(duration) if duration is not None else "Unknown"
 
             emoji = config.EMOJIS.get("voice_leave", "👋")
             
@@ -157,7 +180,7 @@ class Logging(commands.Cog):
             embed.set_thumbnail(url=member.display_avatar.url)
             embed.add_field(name="Duration", value=duration_str, inline=False)
             embed.set_footer(text=f"ID: {member.id}")
-            await channel.send(embed=embed)
+            dispatcher.queue(channel, embed, "log.voice", LOW)
 
         # MOVED
         elif before.channel is not None and after.channel is not None and before.channel != after.channel:
@@ -171,15 +194,41 @@ class Logging(commands.Cog):
             embed.set_author(name="Voice Move", icon_url=member.display_avatar.url)
             embed.set_thumbnail(url=member.display_avatar.url)
             embed.set_footer(text=f"ID: {member.id}")
-            await channel.send(embed=embed)
+            dispatcher.queue(channel, embed, "log.voice", LOW)
 
     # ====================================================
-    # 4. DELETE LOGS (Now using Animated Emojis)
+    # 4. MESSAGE SNAPSHOTS (feed the delete/edit logs)
     # ====================================================
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
+    async def on_message(self, message):
         if message.author.bot or not message.guild: return
-        channel = self.get_log_channel(message.guild, "log_delete_id")
+        if not features.enabled(message.guild.id, Feature.LOG_DELETE | Feature.LOG_EDIT): return
+        snapshots.add(message)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        snapshots.forget_guild(guild.id)
+        voice.forget_guild(guild.id)
+
+    def take_snapshot(self, guild_id, message_id, cached_message):
+        """Our snapshot of a deleted message, or discord.py's cached copy as a fallback."""
+        snapshot = snapshots.pop(guild_id, message_id)
+        if snapshot is None and cached_message and not cached_message.author.bot:
+            snapshot = MessageSnapshot.from_message(cached_message)
+        return snapshot
+
+    # ====================================================
+    # 5. DELETE LOGS (Now using Animated Emojis)
+    # ====================================================
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        if not payload.guild_id or not features.enabled(payload.guild_id, Feature.LOG_DELETE): return
+        snapshot = self.take_snapshot(payload.guild_id, payload.message_id, payload.cached_message)
+        # Purged messages are logged as one transcript by the moderation cog
+        if not snapshot or transcripts.covers(payload.channel_id, payload.message_id): return
+
+        guild = self.bot.get_guild(payload.guild_id)
+        channel = await self.get_log_channel(guild, "log_delete_id") if guild else None
         
         if channel:
             emoji = config.EMOJIS.get("trash", "🗑️")
@@ -189,20 +238,74 @@ class Logging(commands.Cog):
                 color=discord.Color.red(),
                 timestamp=discord.utils.utcnow()
             )
-            embed.add_field(name="Author", value=message.author.mention, inline=True)
-            embed.add_field(name="Channel", value=message.channel.mention, inline=True)
-            content = message.content if message.content else "*[Image/Media]*"
+            embed.add_field(name="Author", value=f"<@{snapshot.author_id}>", inline=True)
+            embed.add_field(name="Channel", value=f"<#{snapshot.channel_id}>", inline=True)
+            content = snapshot.content if snapshot.content else "*[Image/Media]*"
             embed.add_field(name="Content", value=content[:1024], inline=False)
-            embed.set_footer(text=f"ID: {message.author.id}")
-            await channel.send(embed=embed)
+            if snapshot.attachments:
+                embed.add_field(name="Attachments", value="\n".join(snapshot.attachments)[:1024], inline=False)
+            embed.set_footer(text=f"ID: {snapshot.author_id}")
+            dispatcher.queue(channel, embed, "log.delete")
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        if not payload.guild_id or not features.enabled(payload.guild_id, Feature.LOG_DELETE): return
+        cached = {m.id: m for m in payload.cached_messages}
+        found = []
+        for message_id in sorted(payload.message_ids):
+            snapshot = self.take_snapshot(payload.guild_id, message_id, cached.get(message_id))
+            if snapshot and not transcripts.covers(payload.channel_id, message_id):
+                found.append(snapshot)
+        if not found and all(transcripts.covers(payload.channel_id, m) for m in payload.message_ids): return
+
+        guild = self.bot.get_guild(payload.guild_id)
+        channel = await self.get_log_channel(guild, "log_delete_id") if guild else None
+        
+        if channel:
+            emoji = config.EMOJIS.get("trash", "🗑️")
+            lines = []
+            length = 0
+            for snapshot in found:
+                content = snapshot.content or "*[Image/Media]*"
+                line = f"<@{snapshot.author_id}>: {content[:100]}"
+                if length + len(line) > 3500:
+                    lines.append(f"*...and {len(found) - len(lines)} more*")
+                    break
+                lines.append(line)
+                length += len(line) + 1
+
+            embed = discord.Embed(
+                title=f"{emoji} Bulk Delete", 
+                description="\n".join(lines) or "*No cached content*",
+                color=discord.Color.red(),
+                timestamp=discord.utils.utcnow()
+            )
+            embed.add_field(name="Channel", value=f"<#{payload.channel_id}>", inline=True)
+            embed.add_field(name="Messages", value=f"{len(payload.message_ids)} ({len(found)} cached)", inline=True)
+            dispatcher.queue(channel, embed, "log.delete")
 
     # ====================================================
-    # 5. EDIT LOGS (Now using Animated Emojis)
+    # 6. EDIT LOGS (Now using Animated Emojis)
     # ====================================================
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        if before.author.bot or before.content == after.content or not before.guild: return
-        channel = self.get_log_channel(before.guild, "log_edit_id")
+    async def on_raw_message_edit(self, payload):
+        if not payload.guild_id or "content" not in payload.data: return
+        if not features.enabled(payload.guild_id, Feature.LOG_EDIT | Feature.LOG_DELETE): return
+        after_content = payload.data["content"]
+        snapshot = snapshots.get(payload.guild_id, payload.message_id)
+        if snapshot:
+            author_id = snapshot.author_id
+            before_content = snapshots.edit(payload.guild_id, payload.message_id, after_content)
+        elif payload.cached_message and not payload.cached_message.author.bot:
+            author_id = payload.cached_message.author.id
+            before_content = payload.cached_message.content
+        else:
+            return
+        # Snapshots stay current for the delete log even when edits aren't logged
+        if before_content == after_content or not features.enabled(payload.guild_id, Feature.LOG_EDIT): return
+
+        guild = self.bot.get_guild(payload.guild_id)
+        channel = await self.get_log_channel(guild, "log_edit_id") if guild else None
         
         if channel:
             emoji = config.EMOJIS.get("edit", "✏️")
@@ -212,30 +315,32 @@ class Logging(commands.Cog):
                 color=discord.Color.blue(),
                 timestamp=discord.utils.utcnow()
             )
-            embed.add_field(name="Author", value=before.author.mention, inline=True)
-            embed.add_field(name="Channel", value=before.channel.mention, inline=True)
-            embed.add_field(name="Before", value=before.content[:1024], inline=False)
-            embed.add_field(name="After", value=after.content[:1024], inline=False)
-            embed.set_footer(text=f"ID: {before.author.id}")
-            await channel.send(embed=embed)
+            embed.add_field(name="Author", value=f"<@{author_id}>", inline=True)
+            embed.add_field(name="Channel", value=f"<#{payload.channel_id}>", inline=True)
+            embed.add_field(name="Before", value=before_content[:1024] or "*[Empty]*", inline=False)
+            embed.add_field(name="After", value=after_content[:1024] or "*[Empty]*", inline=False)
+            embed.set_footer(text=f"ID: {author_id}")
+            dispatcher.queue(channel, embed, "log.edit")
 
     # ====================================================
-    # 6. MOD LOGS (TIMEOUTS)
+    # 7. MOD LOGS (TIMEOUTS)
     # ====================================================
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
         if not before.timed_out_until and after.timed_out_until:
-            channel = self.get_log_channel(after.guild, "log_mod_id")
+            if not features.enabled(after.guild.id, Feature.LOG_MOD): return
+            channel = await self.get_log_channel(after.guild, "log_mod_id")
             
             if channel:
                 moderator = "Unknown"
                 reason = "No reason provided"
-                if after.guild.me.guild_permissions.view_audit_log:
-                    async for entry in after.guild.audit_logs(limit=1, action=discord.AuditLogAction.member_update):
-                        if entry.target.id == after.id:
-                            moderator = entry.user.mention
-                            reason = entry.reason or reason
-                            break
+                entry = await audit_log.find(
+                    after.guild, discord.AuditLogAction.member_update, after.id,
+                    check=lambda e: getattr(e.after, "timed_out_until", None) is not None
+                )
+                if entry:
+                    moderator = entry.moderator
+                    reason = entry.reason or reason
                 
                 # Using a fallback hourglass emoji if 'timeout' isn't in your config yet
                 emoji = config.EMOJIS.get("timeout", "⏳")
@@ -250,7 +355,52 @@ class Logging(commands.Cog):
                 embed.add_field(name="Duration", value=f"Until {discord.utils.format_dt(after.timed_out_until, 'f')}", inline=False)
                 embed.add_field(name="Reason", value=reason, inline=False)
                 embed.set_footer(text=f"ID: {after.id}")
-                await channel.send(embed=embed)
+                dispatcher.queue(channel, embed, "log.mod", HIGH)
+
+    # ====================================================
+    # 8. AUDIT LOG FEED
+    # ====================================================
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry):
+        # Leave logs need kick entries too, to tell kicks from leaves
+        if not features.enabled(entry.guild.id, Feature.LOG_LEAVE | Feature.LOG_MOD): return
+        audit_log.record(entry)
+
+    # ====================================================
+    # 9. VOICE STATS
+    # ====================================================
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Sessions that started (or ended) while we were offline
+        for guild in self.bot.guilds:
+            await voice.rebuild(guild)
+
+    @app_commands.command(name="voice_stats", description="🎙️ Show who spends the most time in voice")
+    @app_commands.describe(scope="Rank members or channels")
+    @app_commands.choices(scope=[
+        app_commands.Choice(name="Members", value="members"),
+        app_commands.Choice(name="Channels", value="channels")
+    ])
+    async def voice_stats(self, interaction: discord.Interaction, scope: app_commands.Choice[str] = None):
+        kind = scope.value if scope else "members"
+        top = voice.top(interaction.guild_id, kind)
+        if not top:
+            return await interaction.response.send_message("🔇 No voice activity recorded yet.", ephemeral=True)
+
+        medals = ["🥇", "🥈", "🥉"]
+        lines = []
+        for i, (target_id, seconds) in enumerate(top):
+            rank = medals[i] if i < 3 else f"**{i + 1}.**"
+            target = f"<@{target_id}>" if kind == "members" else f"<#{target_id}>"
+            lines.append(f"{rank} {target} — `{self.format_duration(seconds)}`")
+
+        embed = discord.Embed(
+            title=f"🎙️ Voice Leaderboard ({'Members' if kind == 'members' else 'Channels'})",
+            description="\n".join(lines),
+            color=discord.Color.blurple()
+        )
+        embed.set_footer(text=f"{voice.active(interaction.guild_id)} in voice right now")
+        await interaction.response.send_message(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Logging(bot))
\ No newline at end of file
@@ -1,102 +1,453 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
+import asyncio
 import datetime
+import re
+import traceback
 import config
-from collections import defaultdict
+from utils.outbound import outbound, fire, CRITICAL, HIGH, NORMAL
+from utils.database import get_config
+from utils import transcript as transcripts
+from utils.ratelimit import SlidingWindow
+from utils.automod import get_filter
+from utils.duplicates import DuplicateDetector, fingerprint, looks_like_raid, DUP_MESSAGES, DUP_SECONDS
+from utils.concurrency import gather_bounded
+from utils.log_dispatcher import dispatcher
+from utils.purge import PurgeJob
+
+# Anti-spam defaults (per guild overrides: /setup antispam)
+SPAM_MESSAGES = 5
+SPAM_SECONDS = 5
+SPAM_TIMEOUT_MINUTES = 10
+
+# Seconds to keep collecting a duplicate-spam burst before cleaning it up in one go
+DUP_BATCH_DELAY = 1.5
+
+# How often a running /purge updates its progress message (seconds)
+PROGRESS_INTERVAL = 3
+
+# Longest a kick/ban waits for the "you were kicked" DM to go out first (seconds)
+DM_GRACE = 1.5
+
+# Bulk moderation: members actioned at once, and the most one command may touch
+BULK_CONCURRENCY = 5
+BULK_MAX = 1000
+
+MEMBER_ID_RE = re.compile(r"\d{15,20}")
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Anti-Spam Tracking: {user_id: [timestamp, timestamp, ...]}
-        self.spam_check = defaultdict(list)
+        # Anti-Spam Tracking: (guild_id, user_id) -> last N message times
+        self.spam_check = SlidingWindow()
+        # Duplicate content across channels/accounts: (guild_id, content hash) -> recent copies
+        self.duplicates = DuplicateDetector()
+        self.dupe_cleanups = {}  # (guild_id, content hash) -> cleanup Task
+        self.dm_tasks = set()  # DMs still being sent (held so they can't be garbage collected)
+
+    async def cog_load(self):
+        self.sweep_spam_task.start()
+
+    def cog_unload(self):
+        self.sweep_spam_task.cancel()
+
+    @tasks.loop(minutes=5)
+    async def sweep_spam_task(self):
+        # Forget users who stopped talking, so memory follows active users only
+        self.spam_check.sweep()
+        self.duplicates.sweep()
 
     # --- HELPER: DM User ---
-    async def dm_user(self, member, action, reason, moderator):
+    async def dm_user(self, member, action, reason, moderator, priority=HIGH):
         try:
             embed = discord.Embed(title=f"🛑 You were {action}", color=config.COLOR_RED)
             embed.add_field(name="Server", value=member.guild.name, inline=False)
             embed.add_field(name="Reason", value=reason, inline=False)
             embed.set_footer(text=f"Actioned by {moderator}")
-            await member.send(embed=embed)
-        except discord.Forbidden:
+            await outbound.run("mod.dm", priority, lambda: member.send(embed=embed), bucket=("dm", member.id))
+        except discord.HTTPException:
             pass # DM closed
 
+    # --- HELPER: One Moderation Action ---
+    async def punish(self, member, kind, reason, moderator, duration=None, dm_priority=HIGH):
+        """
+        DMs the member and kicks/bans/times them out. The DM runs alongside the
+        action and never holds it up for more than DM_GRACE seconds.
+        """
+        label = {"kick": "Kicked", "ban": "Banned"}.get(kind) or f"Timed Out ({int(duration.total_seconds() // 60)}m)"
+        dm = asyncio.create_task(self.dm_user(member, label, reason, moderator, dm_priority))
+        self.dm_tasks.add(dm)
+        dm.add_done_callback(self.dm_tasks.discard)
+        if kind == "timeout":
+            return await outbound.run("mod.timeout", CRITICAL, lambda: member.timeout(duration, reason=reason))
+        # Once they're out of the server the bot can't DM them, so give the DM a head start
+        await asyncio.wait({dm}, timeout=DM_GRACE)
+        if kind == "kick":
+            return await outbound.run("mod.kick", CRITICAL, lambda: member.kick(reason=reason))
+        return await outbound.run("mod.ban", CRITICAL, lambda: member.ban(reason=reason))
+
+    # --- HELPER: Bulk Target Selection ---
+    def select_members(self, interaction, members=None, role=None, joined_within=None):
+        """
+        Members picked by any mix of IDs/mentions, a role and "joined in the last N minutes".
+        Returns (targets, skipped, not_found); skipped members outrank the moderator or the bot.
+        """
+        guild = interaction.guild
+        picked = {}
+        not_found = 0
+        for member_id in MEMBER_ID_RE.findall(members or ""):
+            member = guild.get_member(int(member_id))
+            if member:
+                picked[member.id] = member
+            else:
+                not_found += 1
+        if role:
+            picked.update((m.id, m) for m in role.members)
+        if joined_within:
+            since = discord.utils.utcnow() - datetime.timedelta(minutes=joined_within)
+            picked.update((m.id, m) for m in guild.members if m.joined_at and m.joined_at >= since)
+
+        targets, skipped = [], 0
+        moderator = interaction.user
+        for member in picked.values():
+            if (member in (moderator, guild.me, guild.owner)
+                    or member.top_role >= guild.me.top_role
+                    or (moderator != guild.owner and member.top_role >= moderator.top_role)):
+                skipped += 1
+            else:
+                targets.append(member)
+        return targets, skipped, not_found
+
+    # --- HELPER: Log Channel ---
+    async def get_log_channel(self, guild, key):
+        data = await get_config(guild.id)
+        channel_id = data.get(key) or data.get("log_channel")
+        if channel_id:
+            return self.bot.get_channel(channel_id)
+        return None
+
+    async def upload_transcript(self, guild, transcript):
+        """Sends the finished transcript to the delete log. Returns the log message (or None)."""
+        channel = await self.get_log_channel(guild, "log_delete_id")
+        if not channel or not transcript.count:
+            return None
+        embed = discord.Embed(
+            title=f"🧹 {transcript.action}",
+            color=config.COLOR_RED,
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name="Moderator", value=transcript.moderator.mention, inline=True)
+        embed.add_field(name="Channel", value=transcript.channel.mention, inline=True)
+        embed.add_field(name="Messages", value=str(transcript.count), inline=True)
+        embed.set_footer(text=f"Moderator ID: {transcript.moderator.id}")
+        try:
+            return await outbound.run("log.transcript", NORMAL, lambda: channel.send(embed=embed, file=transcript.to_file()), bucket=channel.id)
+        except discord.HTTPException as e:
+            print(f"[Purge] Could not upload transcript: {e}")
+            return None
+
     # --- AUTOMOD LISTENER ---
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author.bot or not message.guild: return
         
-        # 1. LINK FILTER
-        if "http" in message.content.lower():
-            # Whitelist
-            allowed = ["youtube.com", "youtu.be", "twitch.tv", "discord.com"]
-            if not any(domain in message.content.lower() for domain in allowed):
-                # Check permissions (Admins bypass)
-                if not message.author.guild_permissions.administrator:
-                    await message.delete()
-                    await message.channel.send(f"⚠️ {message.author.mention}, unauthorized links are not allowed!", delete_after=5)
-                    return
+        data = await get_config(message.guild.id)
 
-        # 2. ANTI-SPAM (5 messages in 5 seconds)
-        now = datetime.datetime.now().timestamp()
-        self.spam_check[message.author.id].append(now)
-        
-        # Remove timestamps older than 5 seconds
-        self.spam_check[message.author.id] = [t for t in self.spam_check[message.author.id] if now - t < 5]
-        
-        if len(self.spam_check[message.author.id]) >= 5:
+        # 1. LINK & WORD FILTER (compiled once per config change, see utils/automod.py)
+        automod = get_filter(message.guild.id, data)
+        warning = None
+        if automod.blocked_link(message.content):
+            warning = f"⚠️ {message.author.mention}, unauthorized links are not allowed!"
+        elif automod.banned_phrase(message.content):
+            warning = f"⚠️ {message.author.mention}, watch your language!"
+        # Check permissions (Admins bypass)
+        if warning and not message.author.guild_permissions.administrator:
+            await outbound.run("automod.delete", CRITICAL, message.delete)
+            fire("automod.warn", HIGH, lambda: message.channel.send(warning, delete_after=5), bucket=message.channel.id)
+            return
+
+        if not data.get("antispam_enabled", True): return
+
+        # 2. DUPLICATE SPAM (default: the same invite/mass ping/blocked link 5 times in 30 seconds, any channel/account)
+        digest = fingerprint(message.content) if looks_like_raid(message.content, automod) else None
+        if digest and not message.author.guild_permissions.administrator:
+            ref = (message.channel.id, message.id, message.author.id)
+            limit = data.get("dupe_messages", DUP_MESSAGES)
+            window = data.get("dupe_seconds", DUP_SECONDS)
+            if self.duplicates.add(message.guild.id, digest, ref, limit, window):
+                key = (message.guild.id, digest)
+                if key not in self.dupe_cleanups:
+                    self.dupe_cleanups[key] = asyncio.get_running_loop().create_task(
+                        self.clean_duplicates(message.guild, digest, message.content, data)
+                    )
+                return
+
+        # 3. ANTI-SPAM (default: 5 messages in 5 seconds)
+        key = (message.guild.id, message.author.id)
+        limit = data.get("antispam_messages", SPAM_MESSAGES)
+        window = data.get("antispam_seconds", SPAM_SECONDS)
+
+        if self.spam_check.hit(key, limit, window):
             # TRIGGER SPAM PROTECTION
             if not message.author.guild_permissions.administrator:
                 try:
-                    # Timeout for 10 minutes
-                    duration = datetime.timedelta(minutes=10)
-                    await message.author.timeout(duration, reason="Anti-Spam Auto-Mod")
-                    await message.channel.send(f"🔇 **{message.author.name}** has been timed out for spamming.")
-                    self.spam_check[message.author.id] = [] # Reset
+                    minutes = data.get("antispam_timeout", SPAM_TIMEOUT_MINUTES)
+                    duration = datetime.timedelta(minutes=minutes)
+                    await outbound.run("automod.timeout", CRITICAL, lambda: message.author.timeout(duration, reason="Anti-Spam Auto-Mod"))
+                    fire("automod.warn", HIGH, lambda: message.channel.send(f"🔇 **{message.author.name}** has been timed out for spamming."), bucket=message.channel.id)
+                    self.spam_check.reset(key)
                 except discord.Forbidden:
                     print(f"Could not timeout {message.author.name}")
 
+    async def clean_duplicates(self, guild, digest, content, data):
+        """One cleanup per burst: bulk delete per channel, timeout every author, one mod log."""
+        try:
+            await asyncio.sleep(DUP_BATCH_DELAY)
+            refs = self.duplicates.take(guild.id, digest)
+        finally:
+            self.dupe_cleanups.pop((guild.id, digest), None)
+        if not refs: return
+
+        by_channel = {}
+        for channel_id, message_id, _ in refs:
+            by_channel.setdefault(channel_id, []).append(message_id)
+        authors = {author_id for _, _, author_id in refs}
+
+        calls = []
+        for channel_id, ids in by_channel.items():
+            channel = guild.get_channel(channel_id)
+            if not channel: continue
+            # The delete log gets the summary below instead of one entry per message
+            transcripts.claim(channel_id, ids)
+            transcripts.release_ids_later(channel_id, ids)
+            for i in range(0, len(ids), 100):
+                chunk = [discord.Object(id=m) for m in ids[i:i + 100]]
+                calls.append(outbound.run("automod.delete", CRITICAL, lambda c=channel, chunk=chunk: c.delete_messages(chunk)))
+
+        duration = datetime.timedelta(minutes=data.get("antispam_timeout", SPAM_TIMEOUT_MINUTES))
+        for author_id in authors:
+            member = guild.get_member(author_id)
+            if member and not member.is_timed_out():
+                calls.append(outbound.run("automod.timeout", CRITICAL, lambda m=member: m.timeout(duration, reason="Duplicate spam (Auto-Mod)")))
+
+        results = await gather_bounded(*calls)
+        failed = sum(isinstance(r, Exception) for r in results)
+
+        channel = await self.get_log_channel(guild, "log_mod_id")
+        if channel:
+            embed = discord.Embed(
+                title="🧹 Duplicate Spam Removed",
+                description=f"```{content[:500]}```",
+                color=config.COLOR_RED,
+                timestamp=discord.utils.utcnow()
+            )
+            embed.add_field(name="Messages", value=str(len(refs)), inline=True)
+            embed.add_field(name="Accounts Timed Out", value=str(len(authors)), inline=True)
+            embed.add_field(name="Channels", value=" ".join(f"<#{c}>" for c in by_channel)[:1024], inline=False)
+            if failed:
+                embed.set_footer(text=f"⚠️ {failed} action(s) failed (missing permissions?)")
+            dispatcher.queue(channel, embed, "log.mod", HIGH)
+
     # --- MOD COMMANDS ---
 
     @app_commands.command(name="kick", description="Kick a member from the server")
     @app_commands.checks.has_permissions(kick_members=True)
     async def kick(self, interaction: discord.Interaction, member: discord.Member, reason: str = "No reason provided"):
-        await self.dm_user(member, "Kicked", reason, interaction.user.name)
-        await member.kick(reason=reason)
+        # The DM head start plus the kick can take longer than Discord waits for a reply
+        await interaction.response.defer()
+        await self.punish(member, "kick", reason, interaction.user.name)
         
         embed = discord.Embed(description=f"👢 **{member.name}** has been kicked.", color=config.COLOR_RED)
         embed.add_field(name="Reason", value=reason)
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="ban", description="Ban a member from the server")
     @app_commands.checks.has_permissions(ban_members=True)
     async def ban(self, interaction: discord.Interaction, member: discord.Member, reason: str = "No reason provided"):
-        await self.dm_user(member, "Banned", reason, interaction.user.name)
-        await member.ban(reason=reason)
+        # The DM head start plus the ban can take longer than Discord waits for a reply
+        await interaction.response.defer()
+        await self.punish(member, "ban", reason, interaction.user.name)
         
         embed = discord.Embed(description=f"🔨 **{member.name}** has been banned.", color=config.COLOR_RED)
         embed.add_field(name="Reason", value=reason)
-        await interaction.response.send_message(embed=embed)
+        await interaction.followup.send(embed=embed)
 
     @app_commands.command(name="timeout", description="Timeout a member")
     @app_commands.describe(minutes="Duration in minutes")
     @app_commands.checks.has_permissions(moderate_members=True)
     async def timeout(self, interaction: discord.Interaction, member: discord.Member, minutes: int, reason: str = "No reason"):
-        duration = datetime.timedelta(minutes=minutes)
-        await member.timeout(duration, reason=reason)
-        
-        await self.dm_user(member, f"Timed Out ({minutes}m)", reason, interaction.user.name)
+        await self.punish(member, "timeout", reason, interaction.user.name, datetime.timedelta(minutes=minutes))
         
         embed = discord.Embed(description=f"⏳ **{member.name}** timed out for {minutes} minutes.", color=config.COLOR_GOLD)
         await interaction.response.send_message(embed=embed)
 
+    # --- BULK MOD COMMANDS ---
+    mass_group = app_commands.Group(name="mass", description="Kick, ban or timeout many members at once")
+
+    async def run_bulk(self, interaction, kind, members, role, joined_within, reason, duration=None):
+        """Shared body of the /mass commands: select, act concurrently, post one summary."""
+        if role and role.is_default():
+            return await interaction.response.send_message("❌ You can't target @everyone.", ephemeral=True)
+        targets, skipped, not_found = self.select_members(interaction, members, role, joined_within)
+        if not targets:
+            return await interaction.response.send_message("❌ No members matched (or all of them outrank you or the bot).", ephemeral=True)
+        if len(targets) > BULK_MAX:
+            return await interaction.response.send_message(f"❌ That matches {len(targets)} members; the limit is {BULK_MAX} per command.", ephemeral=True)
+        await interaction.response.defer()
+
+        moderator = interaction.user.name
+        results = await gather_bounded(
+            *(self.punish(m, kind, reason, moderator, duration, dm_priority=NORMAL) for m in targets),
+            limit=BULK_CONCURRENCY
+        )
+        failed = [m for m, r in zip(targets, results) if isinstance(r, Exception)]
+
+        titles = {"kick": "👢 Mass Kick", "ban": "🔨 Mass Ban", "timeout": "⏳ Mass Timeout"}
+        embed = discord.Embed(title=titles[kind], color=config.COLOR_GOLD if kind == "timeout" else config.COLOR_RED, timestamp=discord.utils.utcnow())
+        embed.add_field(name="Done", value=str(len(targets) - len(failed)), inline=True)
+        embed.add_field(name="Failed", value=str(len(failed)), inline=True)
+        if skipped or not_found:
+            embed.add_field(name="Skipped", value=f"{skipped} outrank you/the bot, {not_found} not found", inline=True)
+        if duration:
+            embed.add_field(name="Duration", value=f"{int(duration.total_seconds() // 60)} minutes", inline=True)
+        embed.add_field(name="Reason", value=reason, inline=False)
+        if failed:
+            embed.add_field(name="Could Not Action", value=", ".join(m.mention for m in failed)[:1024], inline=False)
+        embed.set_footer(text=f"Actioned by {moderator}")
+        await interaction.followup.send(embed=embed)
+
+    @mass_group.command(name="kick", description="Kick many members at once")
+    @app_commands.describe(members="Member mentions or IDs", role="Everyone with this role", joined_within="Everyone who joined in the last N minutes")
+    @app_commands.checks.has_permissions(kick_members=True)
+    async def mass_kick(
+        self,
+        interaction: discord.Interaction,
+        members: str = None,
+        role: discord.Role = None,
+        joined_within: app_commands.Range[int, 1, 10080] = None,
+        reason: str = "No reason provided"
+    ):
+        await self.run_bulk(interaction, "kick", members, role, joined_within, reason)
+
+    @mass_group.command(name="ban", description="Ban many members at once")
+    @app_commands.describe(members="Member mentions or IDs", role="Everyone with this role", joined_within="Everyone who joined in the last N minutes")
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def mass_ban(
+        self,
+        interaction: discord.Interaction,
+        members: str = None,
+        role: discord.Role = None,
+        joined_within: app_commands.Range[int, 1, 10080] = None,
+        reason: str = "No reason provided"
+    ):
+        await self.run_bulk(interaction, "ban", members, role, joined_within, reason)
+
+    @mass_group.command(name="timeout", description="Timeout many members at once")
+    @app_commands.describe(minutes="Duration in minutes", members="Member mentions or IDs", role="Everyone with this role", joined_within="Everyone who joined in the last N minutes")
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def mass_timeout(
+        self,
+        interaction: discord.Interaction,
+        minutes: app_commands.Range[int, 1, 40320],
+        members: str = None,
+        role: discord.Role = None,
+        joined_within: app_commands.Range[int, 1, 10080] = None,
+        reason: str = "No reason"
+    ):
+        await self.run_bulk(interaction, "timeout", members, role, joined_within, reason, datetime.timedelta(minutes=minutes))
+
     @app_commands.command(name="purge", description="Delete multiple messages")
+    @app_commands.describe(
+        amount="How many recent messages to search",
+        user="Only delete messages from this member",
+        bots="Only delete messages from bots",
+        contains="Only delete messages containing this text",
+        attachments="Only delete messages with files or images",
+        after="Only delete messages after this message (ID or link)",
+        before="Only delete messages before this message (ID or link)"
+    )
     @app_commands.checks.has_permissions(manage_messages=True)
-    async def purge(self, interaction: discord.Interaction, amount: int):
+    async def purge(
+        self,
+        interaction: discord.Interaction,
+        amount: app_commands.Range[int, 1, 10000],
+        user: discord.User = None,
+        bots: bool = False,
+        contains: str = None,
+        attachments: bool = False,
+        after: str = None,
+        before: str = None
+    ):
+        try:
+            after = parse_message_ref(after)
+            before = parse_message_ref(before)
+        except ValueError:
+            return await interaction.response.send_message("❌ `after`/`before` must be a message ID or link.", ephemeral=True)
+
+        checks = []
+        if user:
+            checks.append(lambda m: m.author.id == user.id)
+        if bots:
+            checks.append(lambda m: m.author.bot)
+        if contains:
+            needle = contains.casefold()
+            checks.append(lambda m: needle in m.content.casefold())
+        if attachments:
+            checks.append(lambda m: bool(m.attachments))
+        check = (lambda m: all(c(m) for c in checks)) if checks else None
+
         await interaction.response.defer(ephemeral=True)
-        deleted = await interaction.channel.purge(limit=amount)
-        await interaction.followup.send(f"🧹 Deleted {len(deleted)} messages.", ephemeral=True)
+        channel = interaction.channel
+        transcript = transcripts.Transcript(channel, interaction.user)
+        job = PurgeJob(channel, transcript, check)
+        progress = asyncio.create_task(self.show_progress(interaction, job))
+        error = None
+        try:
+            try:
+                await job.run(channel.history(limit=amount, before=before, after=after, oldest_first=False))
+            except Exception as e:
+                error = e
+            # A purge that stopped early still logs what it removed
+            log_msg = await self.upload_transcript(interaction.guild, transcript)
+        finally:
+            progress.cancel()
+            transcripts.release_later(transcript)
+            transcript.close()
+
+        if error:
+            text = f"❌ Purge stopped early: {error}\n" + job.progress()
+        else:
+            text = job.progress().replace("🧹", "✅", 1)
+        if log_msg:
+            text += f"\n[Transcript]({log_msg.jump_url})"
+        try:
+            await interaction.edit_original_response(content=text)
+        except discord.HTTPException:
+            pass  # Interaction expired (purge ran longer than 15 minutes)
+        if error:
+            # Not re-raised: the reply above already explains it, the error handler would post a second one
+            print(f"[Purge] Stopped early in {channel.id}: {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+
+    async def show_progress(self, interaction, job):
+        """Edits the deferred reply with the purge's progress until it finishes."""
+        last = None
+        while not job.done:
+            text = job.progress()
+            if text != last:
+                try:
+                    await interaction.edit_original_response(content=text)
+                except discord.HTTPException:
+                    return
+                last = text
+            await asyncio.sleep(PROGRESS_INTERVAL)
+
+def parse_message_ref(value):
+    """Message ID or jump link -> discord.Object (or None)."""
+    if not value:
+        return None
+    return discord.Object(id=int(value.strip().rstrip("/").split("/")[-1]))
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
\ No newline at end of file
@@ -5,6 +5,11 @@ import datetime
 import traceback
 import os
 import config
+from utils import database
+from utils.storage import get_backend
+from utils import features
+from utils.log_dispatcher import dispatcher
+from utils.outbound import outbound
 
 class Owner(commands.Cog):
     def __init__(self, bot):
@@ -41,7 +46,11 @@ class Owner(commands.Cog):
     async def backup(self, interaction: discord.Interaction):
         if not self.is_owner(interaction): return await interaction.response.send_message("❌ You are not the owner.", ephemeral=True)
         
-        if not os.path.exists("clans.json"):
+        # Make sure pending (write-behind) changes are in the backup
+        await database.flush()
+        backend = get_backend()
+        backup_path = await database.run_blocking(backend.backup_path)
+        if not backup_path:
             return await interaction.response.send_message("❌ No database file found to backup.", ephemeral=True)
 
         channel = self.get_log_channel()
@@ -51,7 +60,8 @@ class Owner(commands.Cog):
         await interaction.response.send_message("✅ Sending backup to log channel...", ephemeral=True)
         
         # Send file
-        file = discord.File("clans.json", filename=f"backup_clans_{datetime.date.today()}.json")
+        ext = os.path.splitext(backup_path)[1]
+        file = discord.File(backup_path, filename=f"backup_{backend.name}_{datetime.date.today()}{ext}")
         await channel.send(content=f"📦 **Manual Backup Requested**", file=file)
 
     @owner_group.command(name="status", description="Change the bot's activity status")
@@ -105,12 +115,69 @@ class Owner(commands.Cog):
         except Exception as e:
             await interaction.response.send_message(f"❌ Error: {e}", ephemeral=True)
 
+    @owner_group.command(name="stats", description="📊 Show event, cache and storage stats")
+    async def stats(self, interaction: discord.Interaction):
+        if not self.is_owner(interaction): return await interaction.response.send_message("❌ You are not the owner.", ephemeral=True)
+        data = features.stats()
+        lines = []
+        for name in sorted(set(data["handled"]) | set(data["skipped"])):
+            handled = data["handled"].get(name, 0)
+            skipped = data["skipped"].get(name, 0)
+            lines.append(f"`{name}`: ✅ {handled} handled | ⏭️ {skipped} skipped")
+        embed = discord.Embed(
+            title="📊 Event Stats",
+            description="\n".join(lines) or "No events yet.",
+            color=discord.Color.blue()
+        )
+        flushes = database.flush_stats()
+        embed.add_field(
+            name="💾 Storage",
+            value=(
+                f"{flushes['flushes']} flushes ({flushes['mutations']} changes), {flushes['pending_guilds']} servers pending\n"
+                f"Flush time: {flushes['last_ms']} ms last | {flushes['avg_ms']} ms avg | {flushes['max_ms']} ms max"
+            ),
+            inline=False
+        )
+        logs = dispatcher.stats()
+        embed.add_field(
+            name="📨 Log Queues",
+            value=(
+                f"{logs['depth']} waiting in {logs['active_channels']} channels (max seen {logs['max_depth']})"
+                + (f", busiest <#{logs['busiest_channel']}>" if logs["busiest_channel"] else "") + "\n"
+                f"{logs['queued']} queued → {logs['embeds']} sent in {logs['messages']} messages | "
+                f"{logs['dropped']} skipped | {logs['failed']} failed"
+            ),
+            inline=False
+        )
+        sends = outbound.stats()
+        depth = " | ".join(f"{name} {count}" for name, count in sends["depth"].items() if name != "critical")
+        # Busiest routes first; the embed only fits so many
+        routes = sorted(sends["routes"].items(), key=lambda item: item[1]["sent"] + item[1]["failed"], reverse=True)[:10]
+        route_lines = [
+            f"`{route}`: {r['sent']} sent, {r['failed']} failed, {r['dropped']} dropped, wait {r['avg_wait_ms']}/{r['max_wait_ms']} ms"
+            for route, r in routes
+        ]
+        embed.add_field(
+            name="🚦 Outbound",
+            value=(f"Queued: {depth} ({sends['buckets']} active buckets)\n" + "\n".join(route_lines))[:1024],
+            inline=False
+        )
+        cache = database.cache_stats()
+        embed.set_footer(text=f"Feature masks: {data['guilds']} servers | Config cache: {cache['hits']} hits, {cache['misses']} misses")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     # ====================================================
     # 3. SYSTEM LOGGING
     # ====================================================
     async def on_app_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         if not interaction.response.is_done():
             await interaction.response.send_message("❌ An error occurred.", ephemeral=True)
+        elif interaction.response.type == discord.InteractionResponseType.deferred_channel_message:
+            # Deferred commands would otherwise stay on "thinking..." forever
+            try:
+                await interaction.followup.send("❌ An error occurred.", ephemeral=True)
+            except discord.HTTPException:
+                pass
         channel = self.get_log_channel()
         if channel:
             embed = discord.Embed(title="⚠️ Bot Error", color=discord.Color.red(), timestamp=datetime.datetime.now())
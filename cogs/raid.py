@@ -0,0 +1,197 @@
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+import datetime
+import time
+import config
+from utils.database import get_config
+from utils.log_dispatcher import dispatcher
+from utils.outbound import outbound, CRITICAL, HIGH
+from utils.concurrency import gather_bounded
+from utils.raid import raids, RAID_SECONDS
+
+# While a raid is on, join logs and welcome cards are replaced by one summary this often (seconds)
+SUMMARY_INTERVAL = 30
+
+# Members listed by name in one summary (the rest are counted)
+SUMMARY_LIST = 40
+
+# Accounts younger than this are called out in summaries
+NEW_ACCOUNT_DAYS = 7
+
+RAID_ACTIONS = [
+    app_commands.Choice(name="Timeout", value="timeout"),
+    app_commands.Choice(name="Kick", value="kick"),
+    app_commands.Choice(name="Ban", value="ban")
+]
+
+class Raid(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        self.summary_task.start()
+
+    def cog_unload(self):
+        self.summary_task.cancel()
+
+    async def get_log_channel(self, guild, key):
+        data = await get_config(guild.id)
+        channel_id = data.get(key) or data.get("log_channel")
+        if channel_id:
+            return self.bot.get_channel(channel_id)
+        return None
+
+    # ====================================================
+    # 1. DETECTION
+    # ====================================================
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        # Logging and Welcome also call record_join; only the first call counts the join
+        raid = raids.record_join(member)
+        if raid is None or raid.announced: return
+        raid.announced = True
+
+        channel = await self.get_log_channel(member.guild, "log_mod_id")
+        if channel:
+            data = await get_config(member.guild.id)
+            embed = discord.Embed(
+                title="🚨 Raid Detected",
+                description=(
+                    f"**{len(raid.cohort)}** members joined within {data.get('raid_seconds', RAID_SECONDS)} seconds.\n"
+                    f"Join logs and welcome cards are paused; a summary is posted every {SUMMARY_INTERVAL}s.\n"
+                    "Use `/raid action` to timeout, kick or ban everyone who joined during the raid."
+                ),
+                color=config.COLOR_RED,
+                timestamp=discord.utils.utcnow()
+            )
+            dispatcher.queue(channel, embed, "log.mod", HIGH)
+
+    # ====================================================
+    # 2. PERIODIC SUMMARIES
+    # ====================================================
+    def summary_embed(self, guild, member_ids, title):
+        now = discord.utils.utcnow()
+        members = [guild.get_member(m) for m in member_ids]
+        new_accounts = sum(1 for m in members if m and (now - m.created_at).days < NEW_ACCOUNT_DAYS)
+
+        listed = ", ".join(f"<@{m}>" for m in member_ids[:SUMMARY_LIST])
+        if len(member_ids) > SUMMARY_LIST:
+            listed += f" +{len(member_ids) - SUMMARY_LIST} more"
+
+        embed = discord.Embed(title=title, description=listed[:4000], color=config.COLOR_GOLD, timestamp=now)
+        embed.add_field(name="Joined", value=str(len(member_ids)), inline=True)
+        embed.add_field(name=f"Accounts < {NEW_ACCOUNT_DAYS} days", value=str(new_accounts), inline=True)
+        embed.set_footer(text=f"Member Count: {guild.member_count}")
+        return embed
+
+    @tasks.loop(seconds=SUMMARY_INTERVAL)
+    async def summary_task(self):
+        for guild_id, raid in raids.items():
+            guild = self.bot.get_guild(guild_id)
+            ids = raid.take_unreported()
+            if not guild or not ids: continue
+            channel = await self.get_log_channel(guild, "log_join_id")
+            if channel:
+                dispatcher.queue(channel, self.summary_embed(guild, ids, "🚨 Raid: Members Joined"), "log.join")
+
+        for guild_id, raid in raids.expire():
+            guild = self.bot.get_guild(guild_id)
+            channel = guild and await self.get_log_channel(guild, "log_mod_id")
+            if channel:
+                self.queue_raid_over(channel, raid)
+
+    @summary_task.before_loop
+    async def before_summary(self):
+        await self.bot.wait_until_ready()
+
+    def queue_raid_over(self, channel, raid):
+        minutes = (time.monotonic() - raid.started) / 60
+        embed = discord.Embed(
+            title="✅ Raid Over",
+            description=f"**{len(raid.cohort)}** members joined over {minutes:.0f} minutes. Join logs and welcome cards are back on.",
+            color=config.COLOR_GREEN,
+            timestamp=discord.utils.utcnow()
+        )
+        dispatcher.queue(channel, embed, "log.mod", HIGH)
+
+    # ====================================================
+    # 3. RAID RESPONSE
+    # ====================================================
+    raid_group = app_commands.Group(name="raid", description="Respond to a join raid")
+
+    @raid_group.command(name="status", description="Show the current raid")
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def status(self, interaction: discord.Interaction):
+        raid = raids.active(interaction.guild_id)
+        if not raid:
+            return await interaction.response.send_message("✅ No raid in progress.", ephemeral=True)
+        embed = self.summary_embed(interaction.guild, list(raid.cohort), "🚨 Raid In Progress")
+        embed.add_field(name="Already Actioned", value=str(len(raid.actioned)), inline=True)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @raid_group.command(name="action", description="Timeout, kick or ban everyone who joined during the raid")
+    @app_commands.describe(action="What to do with the raid members", minutes="Timeout length in minutes", reason="Reason shown in the audit log")
+    @app_commands.choices(action=RAID_ACTIONS)
+    @app_commands.checks.has_permissions(ban_members=True)
+    async def action(
+        self,
+        interaction: discord.Interaction,
+        action: app_commands.Choice[str],
+        minutes: app_commands.Range[int, 1, 40320] = 60,
+        reason: str = "Raid"
+    ):
+        raid = raids.active(interaction.guild_id)
+        if not raid:
+            return await interaction.response.send_message("❌ No raid in progress.", ephemeral=True)
+        await interaction.response.defer(ephemeral=True)
+
+        guild = interaction.guild
+        reason = f"{reason} (by {interaction.user.name})"
+        duration = datetime.timedelta(minutes=minutes)
+        targets, calls = [], []
+        for member_id in raid.cohort:
+            if member_id in raid.actioned: continue
+            member = guild.get_member(member_id)
+            if action.value == "ban":
+                # Members who already left can still be banned by id
+                target = member or discord.Object(id=member_id)
+                calls.append(outbound.run("mod.ban", CRITICAL, lambda t=target: guild.ban(t, reason=reason, delete_message_seconds=3600)))
+            elif member and action.value == "kick":
+                calls.append(outbound.run("mod.kick", CRITICAL, lambda m=member: m.kick(reason=reason)))
+            elif member:
+                calls.append(outbound.run("mod.timeout", CRITICAL, lambda m=member: m.timeout(duration, reason=reason)))
+            else:
+                continue  # Already left
+            targets.append(member_id)
+
+        results = await gather_bounded(*calls)
+        failed = sum(isinstance(r, Exception) for r in results)
+        # Running it again only retries the ones that failed
+        raid.actioned.update(m for m, r in zip(targets, results) if not isinstance(r, Exception))
+
+        text = f"🔨 **{action.name}:** {len(calls) - failed}/{len(calls)} raid members."
+        if failed:
+            text += f"\n⚠️ {failed} failed (missing permissions or role hierarchy?)"
+        await interaction.followup.send(text, ephemeral=True)
+
+        channel = await self.get_log_channel(guild, "log_mod_id")
+        if channel:
+            embed = discord.Embed(title=f"🚨 Raid Response: {action.name}", description=text, color=config.COLOR_RED, timestamp=discord.utils.utcnow())
+            embed.add_field(name="Moderator", value=interaction.user.mention, inline=True)
+            embed.add_field(name="Reason", value=reason, inline=True)
+            dispatcher.queue(channel, embed, "log.mod", HIGH)
+
+    @raid_group.command(name="end", description="Leave raid mode now")
+    @app_commands.checks.has_permissions(moderate_members=True)
+    async def end(self, interaction: discord.Interaction):
+        raid = raids.end(interaction.guild_id)
+        if not raid:
+            return await interaction.response.send_message("❌ No raid in progress.", ephemeral=True)
+        channel = await self.get_log_channel(interaction.guild, "log_mod_id")
+        if channel:
+            self.queue_raid_over(channel, raid)
+        await interaction.response.send_message("✅ Raid mode ended.", ephemeral=True)
+
+async def setup(bot):
+    await bot.add_cog(Raid(bot))
@@ -1,18 +1,47 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.database import update_config
+from utils.database import get_config, update_config, update_many
+from utils.automod import DEFAULT_ALLOWED, normalize_host
+
+LIST_ACTIONS = [
+    app_commands.Choice(name="Add", value="add"),
+    app_commands.Choice(name="Remove", value="remove"),
+    app_commands.Choice(name="Clear", value="clear"),
+    app_commands.Choice(name="Show", value="show")
+]
+
+def edit_list(current, action, items):
+    """Applies add/remove/clear to a config list and returns the new sorted list."""
+    if action == "clear":
+        return []
+    values = set(current)
+    if action == "add":
+        values.update(items)
+    elif action == "remove":
+        values.difference_update(items)
+    return sorted(values)
+
+def split_items(text):
+    return [item.strip() for item in (text or "").replace("\n", ",").split(",") if item.strip()]
 
 class Setup(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    setup_group = app_commands.Group(name="setup", description="Configure the bot")
+    # Hidden from non-admins in the command picker; each command also checks at run time
+    setup_group = app_commands.Group(
+        name="setup",
+        description="Configure the bot",
+        default_permissions=discord.Permissions(administrator=True),
+        guild_only=True
+    )
 
     # ====================================================
     # 1. LOGS SETUP (Added 'nickname' and 'avatar')
     # ====================================================
     @setup_group.command(name="logs", description="Set up all log channels")
+    @app_commands.checks.has_permissions(administrator=True)
     @app_commands.describe(
         join="Channel for Member Join logs",
         leave="Channel for Member Leave logs",
@@ -71,8 +100,7 @@ class Setup(commands.Cog):
             msg_parts.append(f"✅ **Role Logs:** {roles.mention}")
 
         if data:
-            for key, value in data.items():
-                update_config(interaction.guild_id, key, value)
+            await update_many(interaction.guild_id, data)
             await interaction.response.send_message("\n".join(msg_parts))
         else:
             await interaction.response.send_message("❌ You didn't select any channels to setup!", ephemeral=True)
@@ -81,23 +109,26 @@ class Setup(commands.Cog):
     # 2. CLAN SETUP
     # ====================================================
     @setup_group.command(name="clans", description="Configure the Clan System")
+    @app_commands.checks.has_permissions(administrator=True)
     @app_commands.describe(role="The role required to create clans (e.g. @VIP)")
     async def clans(self, interaction: discord.Interaction, role: discord.Role):
-        update_config(interaction.guild_id, "clan_role_id", role.id)
+        await update_config(interaction.guild_id, "clan_role_id", role.id)
         await interaction.response.send_message(f"✅ **Clan System Configured!**\nUsers need the {role.mention} role to create clans.")
 
     # ====================================================
     # 3. WELCOME SETUP
     # ====================================================
     @setup_group.command(name="welcome", description="Set channel for Welcome Cards")
+    @app_commands.checks.has_permissions(administrator=True)
     async def welcome(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        update_config(interaction.guild_id, "welcome_channel_id", channel.id)
+        await update_config(interaction.guild_id, "welcome_channel_id", channel.id)
         await interaction.response.send_message(f"✅ **Welcome Cards** set to {channel.mention}")
 
     # ====================================================
     # 4. STREAMER SETUP
     # ====================================================
     @setup_group.command(name="stream", description="Configure Streamer Alerts")
+    @app_commands.checks.has_permissions(administrator=True)
     @app_commands.describe(
         role="The Role required to trigger alerts (e.g. @Streamer)",
         channel_normal="Channel where normal alerts go",
@@ -124,8 +155,157 @@ class Setup(commands.Cog):
             msg_parts.append(f"✅ **Owner Alerts:** {channel_owner.mention}")
 
         if data:
-            for key, value in data.items():
-                update_config(interaction.guild_id, key, value)
+            await update_many(interaction.guild_id, data)
+            await interaction.response.send_message("\n".join(msg_parts))
+        else:
+            await interaction.response.send_message("❌ You didn't select any options to update!", ephemeral=True)
+
+    # ====================================================
+    # 5. ANTI-SPAM SETUP
+    # ====================================================
+    @setup_group.command(name="antispam", description="Configure the Anti-Spam Auto-Mod")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(
+        enabled="Turn anti-spam on or off",
+        messages="How many messages trigger it (default 5)",
+        seconds="Time window in seconds (default 5)",
+        timeout="Timeout length in minutes (default 10)",
+        duplicates="Copies of one invite, mass ping or blocked link (any channel/account) that count as spam (default 5)",
+        duplicate_seconds="Time window for duplicates in seconds (default 30)"
+    )
+    async def antispam(
+        self,
+        interaction: discord.Interaction,
+        enabled: bool = None,
+        messages: app_commands.Range[int, 2, 50] = None,
+        seconds: app_commands.Range[int, 1, 120] = None,
+        timeout: app_commands.Range[int, 1, 10080] = None,
+        duplicates: app_commands.Range[int, 2, 50] = None,
+        duplicate_seconds: app_commands.Range[int, 5, 600] = None
+    ):
+        data = {}
+        msg_parts = []
+
+        if enabled is not None:
+            data["antispam_enabled"] = enabled
+            msg_parts.append(f"✅ **Anti-Spam:** {'On' if enabled else 'Off'}")
+        if messages:
+            data["antispam_messages"] = messages
+            msg_parts.append(f"✅ **Trigger:** {messages} messages")
+        if seconds:
+            data["antispam_seconds"] = seconds
+            msg_parts.append(f"✅ **Window:** {seconds} seconds")
+        if timeout:
+            data["antispam_timeout"] = timeout
+            msg_parts.append(f"✅ **Timeout:** {timeout} minutes")
+        if duplicates:
+            data["dupe_messages"] = duplicates
+            msg_parts.append(f"✅ **Duplicate Trigger:** {duplicates} copies")
+        if duplicate_seconds:
+            data["dupe_seconds"] = duplicate_seconds
+            msg_parts.append(f"✅ **Duplicate Window:** {duplicate_seconds} seconds")
+
+        if data:
+            await update_many(interaction.guild_id, data)
+            await interaction.response.send_message("\n".join(msg_parts))
+        else:
+            await interaction.response.send_message("❌ You didn't select any options to update!", ephemeral=True)
+
+    # ====================================================
+    # 6. AUTOMOD LISTS
+    # ====================================================
+    @setup_group.command(name="links", description="Manage which links the Auto-Mod allows")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(
+        target="Allowed links (everything else is removed) or Blocked links (always removed)",
+        action="What to do with the list",
+        domains="Comma-separated domains, e.g. github.com, imgur.com (subdomains included)",
+        enabled="Turn the link filter on or off"
+    )
+    @app_commands.choices(target=[
+        app_commands.Choice(name="Allowed", value="link_allow"),
+        app_commands.Choice(name="Blocked", value="link_deny")
+    ], action=LIST_ACTIONS)
+    async def links(
+        self,
+        interaction: discord.Interaction,
+        target: app_commands.Choice[str] = None,
+        action: app_commands.Choice[str] = None,
+        domains: str = None,
+        enabled: bool = None
+    ):
+        data = {}
+        msg_parts = []
+        conf = await get_config(interaction.guild_id)
+
+        if enabled is not None:
+            data["link_filter_enabled"] = enabled
+            msg_parts.append(f"✅ **Link Filter:** {'On' if enabled else 'Off'}")
+
+        if target and action:
+            default = list(DEFAULT_ALLOWED) if target.value == "link_allow" else []
+            current = conf.get(target.value, default)
+            if action.value != "show":
+                # Accept pasted URLs too: keep just the host
+                items = [normalize_host(d.split("//")[-1].split("/")[0]) for d in split_items(domains)]
+                current = edit_list(current, action.value, items)
+                data[target.value] = current
+            shown = ", ".join(f"`{d}`" for d in current) or "*Empty*"
+            msg_parts.append(f"✅ **{target.name} Links ({len(current)}):** {shown}"[:1900])
+
+        if data or msg_parts:
+            if data:
+                await update_many(interaction.guild_id, data)
+            await interaction.response.send_message("\n".join(msg_parts))
+        else:
+            await interaction.response.send_message("❌ Pick a list and an action, or turn the filter on/off!", ephemeral=True)
+
+    @setup_group.command(name="banned_words", description="Manage words and phrases the Auto-Mod removes")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(action="What to do with the list", words="Comma-separated words or phrases")
+    @app_commands.choices(action=LIST_ACTIONS)
+    async def banned_words(self, interaction: discord.Interaction, action: app_commands.Choice[str], words: str = None):
+        conf = await get_config(interaction.guild_id)
+        current = conf.get("banned_words", [])
+        if action.value != "show":
+            current = edit_list(current, action.value, [w.casefold() for w in split_items(words)])
+            await update_config(interaction.guild_id, "banned_words", current)
+        # The list itself is only shown to the admin
+        shown = ", ".join(f"||{w}||" for w in current) or "*Empty*"
+        await interaction.response.send_message(f"✅ **Banned Words ({len(current)}):** {shown}"[:1900], ephemeral=True)
+
+    # ====================================================
+    # 7. RAID PROTECTION
+    # ====================================================
+    @setup_group.command(name="raid", description="Configure join-raid detection")
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(
+        enabled="Turn raid detection on or off",
+        joins="How many joins trigger raid mode (default 10)",
+        seconds="Time window in seconds (default 10)"
+    )
+    async def raid(
+        self,
+        interaction: discord.Interaction,
+        enabled: bool = None,
+        joins: app_commands.Range[int, 3, 200] = None,
+        seconds: app_commands.Range[int, 1, 300] = None
+    ):
+        data = {}
+        msg_parts = []
+
+        if enabled is not None:
+            data["raid_enabled"] = enabled
+            msg_parts.append(f"✅ **Raid Detection:** {'On' if enabled else 'Off'}")
+        if joins:
+            data["raid_joins"] = joins
+            msg_parts.append(f"✅ **Trigger:** {joins} joins")
+        if seconds:
+            data["raid_seconds"] = seconds
+            msg_parts.append(f"✅ **Window:** {seconds} seconds")
+
+        if data:
+            await update_many(interaction.guild_id, data)
             await interaction.response.send_message("\n".join(msg_parts))
         else:
             await interaction.response.send_message("❌ You didn't select any options to update!", ephemeral=True)
@@ -4,7 +4,8 @@ from discord import app_commands
 import datetime
 import asyncio
 import config
-from utils.database import get_config, update_config
+from utils.database import get_config, update_config, update_many
+from utils.outbound import outbound, NORMAL
 
 # ====================================================
 # 🎨 CONFIGURATION: PASTE YOUR LINKS HERE
@@ -139,8 +140,10 @@ class BotStatus(commands.Cog):
         embed = self.create_status_embed()
         msg = await channel.send(embed=embed)
 
-        update_config(interaction.guild_id, "status_channel_id", channel.id)
-        update_config(interaction.guild_id, "status_message_id", msg.id)
+        await update_many(interaction.guild_id, {
+            "status_channel_id": channel.id,
+            "status_message_id": msg.id
+        })
 
         await interaction.followup.send(f"✅ **Live Status** created in {channel.mention}!")
 
@@ -155,7 +158,7 @@ class BotStatus(commands.Cog):
         
         for guild in self.bot.guilds:
             try:
-                data = get_config(guild.id)
+                data = await get_config(guild.id)
                 channel_id = data.get("status_channel_id")
                 message_id = data.get("status_message_id")
 
@@ -164,9 +167,9 @@ class BotStatus(commands.Cog):
                     if channel:
                         try:
                             message = await channel.fetch_message(message_id)
-                            await message.edit(embed=self.create_status_embed())
+                            await outbound.run("status.edit", NORMAL, lambda: message.edit(embed=self.create_status_embed()), bucket=message.channel.id)
                         except (discord.NotFound, discord.Forbidden):
-                            update_config(guild.id, "status_message_id", None)
+                            await update_config(guild.id, "status_message_id", None)
             except Exception as e:
                 print(f"[Status Task] Error in {guild.name}: {e}")
 
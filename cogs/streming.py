@@ -3,6 +3,9 @@ from discord.ext import commands
 import datetime
 import config
 from utils.database import get_config
+from utils.outbound import send, HIGH
+from utils import features
+from utils.features import Feature
 
 class Streamer(commands.Cog):
     def __init__(self, bot):
@@ -11,10 +14,10 @@ class Streamer(commands.Cog):
 
     @commands.Cog.listener()
     async def on_presence_update(self, before, after):
-        if not after.guild: return
+        if not after.guild or not features.enabled(after.guild.id, Feature.STREAM): return
 
         # 1. Get Stream Channel from DB
-        data = get_config(after.guild.id)
+        data = await get_config(after.guild.id)
         channel_id = data.get("stream_channel_id")
         if not channel_id: return
         
@@ -48,7 +51,7 @@ class Streamer(commands.Cog):
             embed.set_thumbnail(url=after.display_avatar.url)
             embed.set_image(url=activity.assets.get('large_image_url') if hasattr(activity, 'assets') else None)
             
-            await channel.send(content=f"Hey @everyone! **{after.name}** is live!", embed=embed)
+            await send("alert.stream", HIGH, channel, content=f"Hey @everyone! **{after.name}** is live!", embed=embed)
             
             # 6. Update Cooldown
             self.stream_cooldowns[user_id] = now
@@ -1,18 +1,31 @@
 import discord
 from discord.ext import commands
+import asyncio
 import datetime
 from utils.database import get_config
+from utils.log_dispatcher import dispatcher
+from utils.outbound import LOW
+from utils import features
+from utils.features import Feature
+
+# Seconds to collect a member's role/nickname/avatar changes before logging them
+DEBOUNCE = 2.0
 
 class UserUpdates(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.pending = {}  # (guild id, member id) -> state before the first change + latest member
+
+    def cog_unload(self):
+        for change in self.pending.values():
+            change["task"].cancel()
 
-    def get_log_channel(self, guild, key):
+    async def get_log_channel(self, guild, key):
         """
         Fetches channel for specific key.
         Fallback: If specific key isn't set, try Main Log Channel.
         """
-        data = get_config(guild.id)
+        data = await get_config(guild.id)
         channel_id = data.get(key)
         
         if not channel_id:
@@ -25,85 +38,91 @@ class UserUpdates(commands.Cog):
     # ====================================================
     # 1. SERVER-SPECIFIC UPDATES (Nicknames, Server Avatars, Roles)
     # ====================================================
+    # Changes are collected per (guild, member) for DEBOUNCE seconds and logged
+    # as one net diff, so an auto-role bot adding 5 roles costs one embed and
+    # a role that is added and removed again costs nothing.
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
         if before.timed_out_until != after.timed_out_until:
             return
+        if not features.enabled(after.guild.id, Feature.LOG_NICKNAME | Feature.LOG_AVATAR | Feature.LOG_ROLE):
+            return
+        if before.nick == after.nick and before.guild_avatar == after.guild_avatar and before.roles == after.roles:
+            return
+
+        key = (after.guild.id, after.id)
+        change = self.pending.get(key)
+        if change is None:
+            # Remember the state before the first change of the window
+            change = self.pending[key] = {
+                "nick": before.nick,
+                "avatar": before.guild_avatar,
+                "display_avatar": before.display_avatar.url,
+                "roles": {r.id for r in before.roles},
+            }
+            change["task"] = asyncio.get_running_loop().create_task(self.flush_member(key))
+        change["member"] = after
 
+    async def flush_member(self, key):
+        await asyncio.sleep(DEBOUNCE)
+        change = self.pending.pop(key, None)
+        if change is None:
+            return
+        member = change["member"]
+        guild = member.guild
         now = discord.utils.utcnow()
-        guild = before.guild
 
-        # --- NICKNAME ---
-        if before.nick != after.nick:
-            channel = self.get_log_channel(guild, "log_nickname_id")
+        # Net differences between the start and the end of the window
+        roles_now = {r.id for r in member.roles}
+        added = roles_now - change["roles"]
+        removed = change["roles"] - roles_now
+        nick_changed = change["nick"] != member.nick
+        avatar_changed = change["avatar"] != member.guild_avatar
+
+        # Group the parts by log channel (they can all share one)
+        parts = {}
+        async def add_part(key_name, part):
+            channel = await self.get_log_channel(guild, key_name)
             if channel:
-                embed = discord.Embed(
-                    title="🏷️ Nickname Changed",
-                    color=discord.Color.blue(),
-                    timestamp=now
-                )
-                embed.set_author(name=after.name, icon_url=after.display_avatar.url)
-                
-                before_nick = before.nick if before.nick else "[None] (Username)"
-                after_nick = after.nick if after.nick else "[None] (Username)"
+                parts.setdefault(channel.id, (channel, []))[1].append(part)
+
+        if nick_changed:
+            await add_part("log_nickname_id", "nick")
+        if avatar_changed:
+            await add_part("log_avatar_id", "avatar")
+        if added or removed:
+            await add_part("log_role_id", "roles")
+
+        titles = {"nick": "🏷️ Nickname Changed", "avatar": "🖼️ Server Avatar Changed", "roles": "🎭 Roles Updated"}
+        for channel, kinds in parts.values():
+            embed = discord.Embed(
+                title=titles[kinds[0]] if len(kinds) == 1 else "👤 Member Updated",
+                color=discord.Color.blue(),
+                timestamp=now
+            )
+            embed.set_author(name=member.name, icon_url=member.display_avatar.url)
 
+            if "nick" in kinds:
+                before_nick = change["nick"] if change["nick"] else "[None] (Username)"
+                after_nick = member.nick if member.nick else "[None] (Username)"
                 embed.add_field(name="Before", value=f"`{before_nick}`", inline=True)
                 embed.add_field(name="After", value=f"`{after_nick}`", inline=True)
-                embed.set_footer(text=f"ID: {after.id}")
-                await channel.send(embed=embed)
 
-        # --- SERVER AVATAR ---
-        # This catches changes when a user uploads a specific "Server Profile" picture
-        if before.guild_avatar != after.guild_avatar:
-            channel = self.get_log_channel(guild, "log_avatar_id")
-            if channel:
-                embed = discord.Embed(
-                    title="🖼️ Server Avatar Changed",
-                    description=f"{after.mention} updated their server profile picture.",
-                    color=discord.Color.gold(),
-                    timestamp=now
-                )
-                embed.set_author(name=after.name, icon_url=after.display_avatar.url)
-                
-                # Use display_avatar to show what is currently visible
-                embed.set_thumbnail(url=before.display_avatar.url)
-                embed.set_image(url=after.display_avatar.url)
-                
-                embed.set_footer(text=f"ID: {after.id}")
-                await channel.send(embed=embed)
-
-        # --- ROLES ---
-        if before.roles != after.roles:
-            channel = self.get_log_channel(guild, "log_role_id")
-            if channel:
-                before_roles = set(before.roles)
-                after_roles = set(after.roles)
+            if "roles" in kinds:
+                if added:
+                    embed.add_field(name="📈 Roles Added", value=", ".join(f"<@&{r}>" for r in added)[:1024], inline=False)
+                if removed:
+                    embed.add_field(name="📉 Roles Removed", value=", ".join(f"<@&{r}>" for r in removed)[:1024], inline=False)
 
-                added_roles = after_roles - before_roles
-                if added_roles:
-                    roles_str = ", ".join([r.mention for r in added_roles])
-                    embed = discord.Embed(
-                        title="📈 Role Added",
-                        description=f"{after.mention} was given the role(s): {roles_str}",
-                        color=discord.Color.green(),
-                        timestamp=now
-                    )
-                    embed.set_author(name=after.name, icon_url=after.display_avatar.url)
-                    embed.set_footer(text=f"ID: {after.id}")
-                    await channel.send(embed=embed)
+            if "avatar" in kinds:
+                embed.description = f"{member.mention} updated their server profile picture."
+                embed.set_thumbnail(url=change["display_avatar"])
+                embed.set_image(url=member.display_avatar.url)
 
-                removed_roles = before_roles - after_roles
-                if removed_roles:
-                    roles_str = ", ".join([r.mention for r in removed_roles])
-                    embed = discord.Embed(
-                        title="📉 Role Removed",
-                        description=f"{after.mention} lost the role(s): {roles_str}",
-                        color=discord.Color.red(),
-                        timestamp=now
-                    )
-                    embed.set_author(name=after.name, icon_url=after.display_avatar.url)
-                    embed.set_footer(text=f"ID: {after.id}")
-                    await channel.send(embed=embed)
+            embed.set_footer(text=f"ID: {member.id}")
+            routes = {"nick": "log.nickname", "avatar": "log.avatar", "roles": "log.role"}
+            route = routes[kinds[0]] if len(kinds) == 1 else "log.member"
+            dispatcher.queue(channel, embed, route, LOW)
 
     # ====================================================
     # 2. GLOBAL UPDATES (Main Profile Picture)
@@ -113,32 +132,35 @@ class UserUpdates(commands.Cog):
         # Check if the global avatar changed
         if before.avatar != after.avatar:
             now = discord.utils.utcnow()
-            
-            # Since 'User' updates are global, we need to check which shared servers config logging for this
-            for guild in self.bot.guilds:
-                # Check if this user is in the guild
-                member = guild.get_member(after.id)
-                if member:
-                    # Check if this specific guild has avatar logging enabled
-                    channel = self.get_log_channel(guild, "log_avatar_id")
-                    if channel:
-                        embed = discord.Embed(
-                            title="🖼️ Global Avatar Changed",
-                            description=f"{member.mention} updated their global profile picture.",
-                            color=discord.Color.gold(),
-                            timestamp=now
-                        )
-                        embed.set_author(name=member.name, icon_url=member.display_avatar.url)
-                        
-                        # Handle cases where before/after might be None (default avatar)
-                        old_url = before.avatar.url if before.avatar else before.default_avatar.url
-                        new_url = after.avatar.url if after.avatar else after.default_avatar.url
-
-                        embed.set_thumbnail(url=old_url)
-                        embed.set_image(url=new_url)
-                        
-                        embed.set_footer(text=f"ID: {member.id}")
-                        await channel.send(embed=embed)
+
+            # Only visit the guilds that log avatars, instead of every guild the bot is in
+            # (User.mutual_guilds itself scans every guild, so the index drives the loop)
+            for guild_id in list(await features.guilds_with(Feature.LOG_AVATAR)):
+                guild = self.bot.get_guild(guild_id)
+                member = guild.get_member(after.id) if guild else None
+                if not member or not features.enabled(guild_id, Feature.LOG_AVATAR):
+                    continue
+
+                channel = await self.get_log_channel(guild, "log_avatar_id")
+                if channel:
+                    embed = discord.Embed(
+                        title="🖼️ Global Avatar Changed",
+                        description=f"{member.mention} updated their global profile picture.",
+                        color=discord.Color.gold(),
+                        timestamp=now
+                    )
+                    embed.set_author(name=member.name, icon_url=member.display_avatar.url)
+                    
+                    # Handle cases where before/after might be None (default avatar)
+                    old_url = before.avatar.url if before.avatar else before.default_avatar.url
+                    new_url = after.avatar.url if after.avatar else after.default_avatar.url
+
+                    embed.set_thumbnail(url=old_url)
+                    embed.set_image(url=new_url)
+                    
+                    embed.set_footer(text=f"ID: {member.id}")
+                    # Queued per channel: the dispatcher sends to all guilds concurrently
+                    dispatcher.queue(channel, embed, "log.avatar", LOW)
 
 async def setup(bot):
     await bot.add_cog(UserUpdates(bot))
\ No newline at end of file
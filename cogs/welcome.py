@@ -2,6 +2,10 @@ import discord
 from discord.ext import commands
 import config
 from utils.database import get_config
+from utils.outbound import send, HIGH
+from utils import features
+from utils.features import Feature
+from utils.raid import raids
 
 class Welcome(commands.Cog):
     def __init__(self, bot):
@@ -18,7 +22,10 @@ class Welcome(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
-        data = get_config(member.guild.id)
+        # During a raid the Raid cog posts periodic summaries instead
+        if raids.record_join(member): return
+        if not features.enabled(member.guild.id, Feature.WELCOME): return
+        data = await get_config(member.guild.id)
         channel_id = data.get("welcome_channel_id")
         
         if not channel_id: return
@@ -73,7 +80,7 @@ class Welcome(commands.Cog):
             )
 
             embed.set_footer(text=f"{member.guild.name} • Member #{member.guild.member_count}")
-            await channel.send(content=f"Welcome {member.mention}! 👋", embed=embed)
+            await send("alert.welcome", HIGH, channel, content=f"Welcome {member.mention}! 👋", embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Welcome(bot))
\ No newline at end of file
@@ -8,6 +8,33 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 OWNER_ID = 746366595458138183
 BOT_LOG_CHANNEL = 1468368359761645640  # Replace with YOUR User ID (for debugging)
 
+# --- STORAGE ---
+# "json" keeps everything in data/*.json (fine for small installs).
+# "sqlite" uses a WAL-mode database; run `python -m utils.migrate` once to import the JSON files.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "data/janitorbot.sqlite3")
+# Write-behind: batch changes in memory and flush them every FLUSH_INTERVAL seconds (and on shutdown).
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "1") == "1"
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", "2.0"))
+
+# --- OUTBOUND ---
+# When a log channel backs up, low-priority logs (voice, roles, nicknames, avatars) past
+# LOW_LOG_BACKLOG are either "summarize"d into one "N skipped" note or "drop"ped silently.
+LOW_LOG_BACKLOG = int(os.getenv("LOW_LOG_BACKLOG", "30"))
+LOG_OVERFLOW_POLICY = {
+    "log.voice": "summarize",
+    "log.role": "summarize",
+    "log.nickname": "summarize",
+    "log.avatar": "drop",
+}
+
+# --- MESSAGE CACHE ---
+# Delete/edit logs keep a small snapshot of recent messages. Each guild gets up to
+# MESSAGE_CACHE_GUILD_KB; all guilds together never use more than MESSAGE_CACHE_TOTAL_MB
+# (when full, the guild using the most gives up its oldest messages first).
+MESSAGE_CACHE_GUILD_KB = int(os.getenv("MESSAGE_CACHE_GUILD_KB", "512"))
+MESSAGE_CACHE_TOTAL_MB = int(os.getenv("MESSAGE_CACHE_TOTAL_MB", "64"))
+
 # --- VISUALS ---
 EMOJIS = {
     "trash": "<a:anim_trash:1468227963790033121>",   # Replace with your Trash ID
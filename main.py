@@ -3,10 +3,20 @@ import os
 import asyncio
 from discord.ext import commands
 import config
+from utils import database
+from utils.log_dispatcher import dispatcher
 
 # --- SETUP ---
+class Janitorbot(commands.Bot):
+    async def close(self):
+        # Send queued log embeds while we are still connected
+        await dispatcher.flush_all()
+        await super().close()
+
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Delete/edit logs use utils.message_cache snapshots, so discord.py's own
+# (much heavier) message cache only needs to cover recent interactions
+bot = Janitorbot(command_prefix="!", intents=intents, max_messages=100)
 
 # --- LOAD COGS ---
 async def load_extensions():
@@ -35,7 +45,13 @@ async def on_ready():
 async def main():
     async with bot:
         await load_extensions()
-        await bot.start(config.TOKEN)
+        # Load configs before the gateway starts dispatching events
+        await database.ensure_loaded()
+        try:
+            await bot.start(config.TOKEN)
+        finally:
+            # Let pending storage writes finish before the process exits
+            await database.close()
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
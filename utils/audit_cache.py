@@ -0,0 +1,144 @@
+import asyncio
+import datetime
+import discord
+
+# How long audit entries are kept for attribution (seconds)
+AUDIT_TTL = 30.0
+
+# How long a lookup waits for the gateway to deliver the matching entry.
+# Audit events usually arrive a moment after the member event they explain.
+AUDIT_WAIT = 2.0
+
+# Recent entries kept per (guild, action, target)
+ENTRIES_PER_KEY = 4
+
+class AuditEntry:
+    """The parts of an audit log entry the logs need."""
+    __slots__ = ("user_id", "reason", "created_at", "after")
+
+    def __init__(self, user_id, reason, created_at, after):
+        self.user_id = user_id
+        self.reason = reason
+        self.created_at = created_at
+        self.after = after
+
+    @classmethod
+    def from_entry(cls, entry):
+        user_id = entry.user.id if entry.user else getattr(entry, "user_id", None)
+        return cls(user_id, entry.reason, entry.created_at, entry.after)
+
+    @property
+    def moderator(self):
+        return f"<@{self.user_id}>" if self.user_id else "Unknown"
+
+class AuditCache:
+    """
+    Recent audit log entries fed by on_audit_log_entry_create, indexed by
+    (guild id, action, target id). Attribution is a dict lookup instead of a
+    REST call, and simultaneous kicks/timeouts can't be mixed up.
+    """
+    def __init__(self, ttl=AUDIT_TTL):
+        self.ttl = ttl
+        self.enabled = False  # set when the bot has the moderation intent
+        self._entries = {}  # (guild id, action, target id) -> list of AuditEntry, newest last
+        self._waiters = {}  # same key -> list of Futures
+        self._stats = {"recorded": 0, "hits": 0, "misses": 0, "rest": 0}
+
+    def _fresh(self, entry, max_age):
+        age = (discord.utils.utcnow() - entry.created_at).total_seconds()
+        return age <= max_age
+
+    def record(self, entry):
+        """Store a gateway audit entry and wake up anyone waiting for it."""
+        if entry.target is None:
+            return
+        key = (entry.guild.id, entry.action, entry.target.id)
+        item = AuditEntry.from_entry(entry)
+
+        entries = [e for e in self._entries.get(key, ()) if self._fresh(e, self.ttl)]
+        entries.append(item)
+        self._entries[key] = entries[-ENTRIES_PER_KEY:]
+        self._stats["recorded"] += 1
+
+        for waiter in self._waiters.pop(key, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+
+        if self._stats["recorded"] % 256 == 0:
+            self.sweep()
+
+    def sweep(self):
+        """Drop expired entries."""
+        for key in [k for k, entries in self._entries.items() if not self._fresh(entries[-1], self.ttl)]:
+            del self._entries[key]
+
+    def _find_local(self, key, max_age, check):
+        for entry in reversed(self._entries.get(key, ())):
+            if self._fresh(entry, max_age) and (check is None or check(entry)):
+                return entry
+        return None
+
+    def is_live(self, guild):
+        """True if this guild's audit events reach us, so a miss really means 'no entry'."""
+        me = guild.me
+        return bool(self.enabled and me and me.guild_permissions.view_audit_log)
+
+    async def find(self, guild, action, target_id, max_age=10.0, check=None, wait=AUDIT_WAIT):
+        """
+        Newest entry for (action, target) younger than max_age seconds, or None.
+        Waits briefly for the gateway event; falls back to REST only when this
+        guild's audit events can't be received.
+        """
+        key = (guild.id, action, target_id)
+        entry = self._find_local(key, max_age, check)
+        if entry:
+            self._stats["hits"] += 1
+            return entry
+
+        if self.is_live(guild):
+            deadline = asyncio.get_running_loop().time() + wait
+            while entry is None:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.setdefault(key, []).append(waiter)
+                try:
+                    await asyncio.wait_for(waiter, timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                finally:
+                    waiters = self._waiters.get(key)
+                    if waiters and waiter in waiters:
+                        waiters.remove(waiter)
+                        if not waiters:
+                            del self._waiters[key]
+                entry = self._find_local(key, max_age, check)
+
+            self._stats["hits" if entry else "misses"] += 1
+            return entry
+
+        return await self._fetch(guild, action, target_id, max_age, check)
+
+    async def _fetch(self, guild, action, target_id, max_age, check):
+        """REST fallback for guilds whose audit events we don't receive."""
+        me = guild.me
+        if not (me and me.guild_permissions.view_audit_log):
+            return None
+        self._stats["rest"] += 1
+        after = discord.utils.utcnow() - datetime.timedelta(seconds=max_age)
+        try:
+            async for raw in guild.audit_logs(limit=10, action=action, after=after, oldest_first=False):
+                if raw.target and raw.target.id == target_id:
+                    entry = AuditEntry.from_entry(raw)
+                    if check is None or check(entry):
+                        return entry
+        except discord.HTTPException:
+            pass
+        return None
+
+    def stats(self):
+        return {**self._stats, "entries": len(self._entries)}
+
+# Process-wide cache, fed by the logging cog
+audit_log = AuditCache()
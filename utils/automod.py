@@ -0,0 +1,152 @@
+import re
+from collections import deque
+from urllib.parse import urlsplit
+from utils import database
+
+# Used when a guild hasn't set its own allow list
+DEFAULT_ALLOWED = ("youtube.com", "youtu.be", "twitch.tv", "discord.com")
+
+URL_RE = re.compile(r"(?:https?://|www\.)[^\s<>\"'`]+", re.IGNORECASE)
+
+# ====================================================
+# 1. HOSTS
+# ====================================================
+def normalize_host(host):
+    """Lower-case, strip port/trailing dot/'www.', and punycode IDNs so look-alikes compare equal."""
+    host = host.strip().lower().rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host
+
+def extract_hosts(text):
+    """Normalized host of every link in a message."""
+    hosts = []
+    for match in URL_RE.finditer(text):
+        url = match.group(0)
+        if not url.lower().startswith("http"):
+            url = "http://" + url
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            continue
+        if host:
+            hosts.append(normalize_host(host))
+    return hosts
+
+def suffix_match(host, domains):
+    """True if host is one of `domains` or a subdomain of one. O(labels), not O(len(domains))."""
+    labels = host.split(".")
+    for i in range(len(labels)):
+        if ".".join(labels[i:]) in domains:
+            return True
+    return False
+
+# ====================================================
+# 2. PHRASES (Aho-Corasick)
+# ====================================================
+class PhraseMatcher:
+    """
+    Finds any of many banned phrases in one pass over the message, so the
+    cost per message doesn't grow with the size of the list. Matches must
+    start and end on word boundaries ("ass" doesn't match "class").
+    """
+    def __init__(self, phrases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for phrase in phrases:
+            phrase = " ".join(phrase.casefold().split())
+            if phrase:
+                self._add(phrase)
+        self._build()
+
+    def _add(self, phrase):
+        state = 0
+        for char in phrase:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = self._out[state] + (phrase,)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(char, 0)
+                self._fail[nxt] = candidate if candidate != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __bool__(self):
+        return len(self._goto) > 1
+
+    def find(self, text):
+        """First banned phrase in text, or None."""
+        text = " ".join(text.casefold().split())
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for phrase in self._out[state]:
+                start = i - len(phrase) + 1
+                before = text[start - 1] if start > 0 else " "
+                after = text[i + 1] if i + 1 < len(text) else " "
+                if not before.isalnum() and not after.isalnum():
+                    return phrase
+        return None
+
+# ====================================================
+# 3. PER-GUILD FILTERS
+# ====================================================
+class GuildFilter:
+    """A guild's compiled automod settings."""
+    def __init__(self, conf):
+        allowed = conf.get("link_allow")
+        self.allowed = {normalize_host(d) for d in (allowed if allowed is not None else DEFAULT_ALLOWED)}
+        self.denied = {normalize_host(d) for d in conf.get("link_deny", ())}
+        self.links_enabled = conf.get("link_filter_enabled", True)
+        self.phrases = PhraseMatcher(conf.get("banned_words", ()))
+
+    def blocked_link(self, text):
+        """The first link host that isn't allowed, or None."""
+        if not self.links_enabled:
+            return None
+        for host in extract_hosts(text):
+            if suffix_match(host, self.denied) or not suffix_match(host, self.allowed):
+                return host
+        return None
+
+    def banned_phrase(self, text):
+        return self.phrases.find(text) if self.phrases else None
+
+_filters = {}  # guild id (str) -> GuildFilter
+
+def _invalidate(guild_id):
+    if guild_id is None:
+        _filters.clear()
+    else:
+        _filters.pop(str(guild_id), None)
+
+database.on_config_change(_invalidate)
+
+def get_filter(guild_id, conf):
+    """The guild's compiled filter; rebuilt only after its config changes."""
+    key = str(guild_id)
+    compiled = _filters.get(key)
+    if compiled is None:
+        compiled = _filters[key] = GuildFilter(conf)
+    return compiled
@@ -0,0 +1,257 @@
+from bisect import bisect_left, insort
+from utils import database
+from utils.storage import get_backend
+
+# Ranking key of the global leaderboard (None is a real guild id for clans from before guild ids were stored)
+GLOBAL = object()
+
+# ====================================================
+# 1. CLAN RECORD
+# ====================================================
+class Clan:
+    __slots__ = ("channel_id", "guild_id", "name", "leader_id", "role_id", "members")
+
+    def __init__(self, channel_id, name, leader_id, guild_id=None, role_id=None, members=()):
+        self.channel_id = int(channel_id)
+        self.guild_id = guild_id
+        self.name = name
+        self.leader_id = leader_id
+        self.role_id = role_id
+        self.members = set(members)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            channel_id=data["channel_id"],
+            name=data["name"],
+            leader_id=data["leader_id"],
+            guild_id=data.get("guild_id"),
+            role_id=data.get("role_id"),
+            members=data.get("members", []),
+        )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "guild_id": self.guild_id,
+            "leader_id": self.leader_id,
+            "channel_id": self.channel_id,
+            "role_id": self.role_id,
+            "members": sorted(self.members),
+        }
+
+# ====================================================
+# 2. RESIDENT STORE
+# ====================================================
+class ClanStore(database.ResidentStore):
+    """
+    All clans, kept in memory with O(1) indexes:
+      - by clan channel id
+      - by (guild id, case-folded name)
+      - by member id -> clan channel ids
+    plus a per-guild sorted search index for autocomplete and a live
+    leaderboard (global and per guild) ranked by member count.
+
+    Changes are persisted per clan through the write-behind flusher in
+    utils/database.py, so one kick no longer rewrites every clan.
+    """
+    def __init__(self):
+        super().__init__()
+        self.loaded = False
+        self._by_channel = {}
+        self._by_name = {}
+        self._by_member = {}
+        # guild id -> sorted [(case-folded key, channel id)], one key per word start
+        self._search = {}
+        # Leaderboards: sorted [(-member count, channel id)], per guild id and under GLOBAL
+        self._ranking = {GLOBAL: []}
+        self._ranking_versions = {GLOBAL: 0}
+
+    # --- LOADING ---
+    async def load(self):
+        if self.loaded:
+            return
+        data = await database.run_blocking(lambda: get_backend().load_clans())
+        for record in data.values():
+            self._index(Clan.from_dict(record), rank=False)
+        for clan in self._by_channel.values():
+            self._ranking[GLOBAL].append(self._rank_key(clan))
+            if clan.guild_id is not None:
+                self._ranking.setdefault(clan.guild_id, []).append(self._rank_key(clan))
+        for ranking in self._ranking.values():
+            ranking.sort()
+        self._records = {str(c.channel_id): c.to_dict() for c in self._by_channel.values()}
+        self.loaded = True
+        database.register_store(self)
+
+    def _name_key(self, guild_id, name):
+        return (guild_id, name.casefold())
+
+    def _search_keys(self, name):
+        # "The Night Owls" -> "the night owls", "night owls", "owls"
+        words = name.casefold().split()
+        return {" ".join(words[i:]) for i in range(len(words))} or {name.casefold()}
+
+    # --- LEADERBOARD ---
+    def _rank_key(self, clan):
+        return (-len(clan.members), clan.channel_id)
+
+    def _bump(self, guild_id):
+        self._ranking_versions[GLOBAL] += 1
+        if guild_id is not None:
+            self._ranking_versions[guild_id] = self._ranking_versions.get(guild_id, 0) + 1
+
+    def _rank(self, clan):
+        key = self._rank_key(clan)
+        insort(self._ranking[GLOBAL], key)
+        if clan.guild_id is not None:
+            insort(self._ranking.setdefault(clan.guild_id, []), key)
+        self._bump(clan.guild_id)
+
+    def _unrank(self, clan):
+        key = self._rank_key(clan)
+        guild_ranking = self._ranking.get(clan.guild_id, []) if clan.guild_id is not None else []
+        for ranking in (self._ranking[GLOBAL], guild_ranking):
+            i = bisect_left(ranking, key)
+            if i < len(ranking) and ranking[i] == key:
+                del ranking[i]
+        self._bump(clan.guild_id)
+
+    def _index(self, clan, rank=True):
+        self._by_channel[clan.channel_id] = clan
+        self._by_name[self._name_key(clan.guild_id, clan.name)] = clan.channel_id
+        for member_id in clan.members:
+            self._by_member.setdefault(member_id, set()).add(clan.channel_id)
+        entries = self._search.setdefault(clan.guild_id, [])
+        for key in self._search_keys(clan.name):
+            insort(entries, (key, clan.channel_id))
+        if rank:
+            self._rank(clan)
+
+    def _unindex(self, clan):
+        self._by_channel.pop(clan.channel_id, None)
+        key = self._name_key(clan.guild_id, clan.name)
+        if self._by_name.get(key) == clan.channel_id:
+            del self._by_name[key]
+        for member_id in clan.members:
+            self._unindex_member(member_id, clan.channel_id)
+        entries = self._search.get(clan.guild_id, [])
+        for key in self._search_keys(clan.name):
+            i = bisect_left(entries, (key, clan.channel_id))
+            if i < len(entries) and entries[i] == (key, clan.channel_id):
+                del entries[i]
+        self._unrank(clan)
+
+    def _unindex_member(self, member_id, channel_id):
+        channels = self._by_member.get(member_id)
+        if channels:
+            channels.discard(channel_id)
+            if not channels:
+                del self._by_member[member_id]
+
+    # --- LOOKUPS (no I/O) ---
+    def get(self, channel_id):
+        return self._by_channel.get(int(channel_id))
+
+    def get_by_name(self, guild_id, name):
+        channel_id = self._by_name.get(self._name_key(guild_id, name))
+        if channel_id is None:
+            # Clans created before guild ids were stored
+            channel_id = self._by_name.get(self._name_key(None, name))
+        return self._by_channel.get(channel_id) if channel_id is not None else None
+
+    def search(self, guild_id, text, limit=25):
+        """Clans of one guild matching `text`: word prefixes first, then substrings."""
+        entries = self._search.get(guild_id, [])
+        query = text.casefold().strip()
+        found = []
+        seen = set()
+
+        i = bisect_left(entries, (query,))
+        while i < len(entries) and len(found) < limit and entries[i][0].startswith(query):
+            channel_id = entries[i][1]
+            if channel_id not in seen:
+                seen.add(channel_id)
+                found.append(self._by_channel[channel_id])
+            i += 1
+
+        if query and len(found) < limit:
+            for key, channel_id in entries:
+                if channel_id not in seen and query in key:
+                    seen.add(channel_id)
+                    found.append(self._by_channel[channel_id])
+                    if len(found) >= limit:
+                        break
+        return found
+
+    def leaderboard(self, guild_id=None, page=0, per_page=10):
+        """One page of the ranking (global if guild_id is None). Costs O(page)."""
+        ranking = self._ranking.get(GLOBAL if guild_id is None else guild_id, [])
+        start = page * per_page
+        return [self._by_channel[channel_id] for _, channel_id in ranking[start:start + per_page]]
+
+    def leaderboard_size(self, guild_id=None):
+        return len(self._ranking.get(GLOBAL if guild_id is None else guild_id, []))
+
+    def ranking_version(self, guild_id=None):
+        """Changes whenever that leaderboard (or what it displays) changes."""
+        return self._ranking_versions.get(GLOBAL if guild_id is None else guild_id, 0)
+
+    def clans_of(self, member_id):
+        return [self._by_channel[c] for c in self._by_member.get(member_id, ())]
+
+    def all(self):
+        return self._by_channel.values()
+
+    def __len__(self):
+        return len(self._by_channel)
+
+    # --- CHANGES ---
+    async def create(self, channel_id, name, leader_id, guild_id=None, role_id=None):
+        clan = Clan(channel_id, name, leader_id, guild_id=guild_id, role_id=role_id, members=[leader_id])
+        self._index(clan)
+        await self._changed(clan.channel_id, clan.to_dict())
+        return clan
+
+    async def add_member(self, clan, member_id):
+        if member_id in clan.members:
+            return False
+        self._unrank(clan)
+        clan.members.add(member_id)
+        self._rank(clan)
+        self._by_member.setdefault(member_id, set()).add(clan.channel_id)
+        await self._changed(clan.channel_id, clan.to_dict())
+        return True
+
+    async def remove_member(self, clan, member_id):
+        if member_id not in clan.members:
+            return False
+        self._unrank(clan)
+        clan.members.discard(member_id)
+        self._rank(clan)
+        self._unindex_member(member_id, clan.channel_id)
+        await self._changed(clan.channel_id, clan.to_dict())
+        return True
+
+    async def set_leader(self, clan, leader_id):
+        clan.leader_id = leader_id
+        self._bump(clan.guild_id)
+        await self._changed(clan.channel_id, clan.to_dict())
+
+    async def set_guild(self, clan, guild_id):
+        """Backfill the guild of a clan created before guild ids were stored."""
+        self._unindex(clan)
+        clan.guild_id = guild_id
+        self._index(clan)
+        await self._changed(clan.channel_id, clan.to_dict())
+
+    async def delete(self, clan):
+        self._unindex(clan)
+        await self._changed(clan.channel_id, None)
+
+    # --- PERSISTENCE (storage thread) ---
+    def write_batch(self, backend, changed, deleted, all_records):
+        backend.save_clan_batch(changed, deleted, all_records)
+
+# Process-wide store, loaded by the clan cog
+clans = ClanStore()
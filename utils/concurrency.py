@@ -0,0 +1,17 @@
+import asyncio
+
+# Default number of Discord REST calls one command may have in flight at once
+DEFAULT_LIMIT = 4
+
+async def gather_bounded(*aws, limit=DEFAULT_LIMIT):
+    """
+    Run awaitables concurrently, at most `limit` at a time.
+    Results come back in order; exceptions are returned instead of raised.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws), return_exceptions=True)
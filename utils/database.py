@@ -1,40 +1,360 @@
-import json
-import os
+import abc
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+from utils.storage import get_backend
 
-# Define path
-DATA_DIR = "data"
-DATA_FILE = os.path.join(DATA_DIR, "server_configs.json")
+# How often (in seconds) the cache checks the backend for outside edits
+CACHE_CHECK_INTERVAL = 1.0
 
-# Ensure directory and file exist
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
+# Write-behind: changes are kept in memory and flushed every FLUSH_INTERVAL
+# seconds (and on shutdown) instead of rewriting the data file on every change.
+WRITE_BEHIND = getattr(config, "WRITE_BEHIND", True)
+FLUSH_INTERVAL = getattr(config, "FLUSH_INTERVAL", 2.0)
 
-if not os.path.exists(DATA_FILE):
-    with open(DATA_FILE, "w") as f:
-        json.dump({}, f)
+# All storage I/O runs on this single thread, so a slow disk never blocks the
+# event loop (gateway heartbeat) and backend calls never run concurrently.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
 
-def get_config(guild_id):
-    """Fetch configuration for a specific server."""
-    with open(DATA_FILE, "r") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            data = {}
-    return data.get(str(guild_id), {})
+async def run_blocking(func, *args):
+    """Run a blocking storage call on the storage thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+def _backend_call(method, *args):
+    return getattr(get_backend(), method)(*args)
+
+# ====================================================
+# 1. CONFIG CACHE
+# ====================================================
+# All configs live in memory and are only touched from the event loop; the
+# storage thread just does I/O. Per-guild dicts are replaced, never mutated,
+# so a snapshot handed to the storage thread can't change under it.
+_cache = {}
+_cache_version = None
+_loaded = False
+_last_check = 0.0
+_stats = {"hits": 0, "misses": 0}
+_change_listeners = []
+_inflight = None  # the reload every concurrent caller waits on
+
+def on_config_change(callback):
+    """Register callback(guild_id) for config changes; guild_id is None when everything reloaded."""
+    _change_listeners.append(callback)
+
+def _notify(guild_id):
+    for callback in _change_listeners:
+        callback(guild_id)
+
+def _needs_check():
+    return not _loaded or time.monotonic() - _last_check >= CACHE_CHECK_INTERVAL
+
+def _load_if_changed(loaded, known_version):
+    backend = get_backend()
+    version = backend.version()
+    if loaded and version == known_version:
+        return version, None
+    return version, backend.load_configs()
+
+async def _refresh(force=False):
+    """
+    Reload the cache if the backend was changed by someone else. Concurrent
+    callers (e.g. the startup event flood before the first load) share one
+    reload instead of each queueing their own.
+    """
+    global _inflight
+    if not force and not _needs_check():
+        return False
+    if _inflight is None:
+        _inflight = asyncio.get_running_loop().create_task(_reload())
+        _inflight.add_done_callback(_reload_done)
+    # Shielded: a cancelled caller must not cancel everyone else's load
+    return await asyncio.shield(_inflight)
+
+def _reload_done(task):
+    global _inflight
+    if _inflight is task:
+        _inflight = None
+
+async def _reload():
+    global _cache, _cache_version, _loaded, _last_check
+    _last_check = time.monotonic()
+
+    # Unflushed changes are newer than whatever is on disk
+    if _loaded and _dirty:
+        return False
+
+    version, data = await run_blocking(_load_if_changed, _loaded, _cache_version)
+    if data is None or (_loaded and _dirty):
+        return False
+    _cache = data
+    _cache_version = version
+    _loaded = True
+    _notify(None)
+    return True
+
+def _save_configs_blocking(changed, configs):
+    backend = get_backend()
+    backend.save_config_batch(changed, configs)
+    return backend.version()
+
+async def get_config(guild_id):
+    """Fetch configuration for a specific server (read-only, do not mutate)."""
+    # Fast path: a plain dict lookup, no await on the storage thread
+    if _needs_check() and await _refresh():
+        _stats["misses"] += 1
+    else:
+        _stats["hits"] += 1
+    return _cache.get(str(guild_id), {})
 
-def update_config(guild_id, key, value):
+async def update_config(guild_id, key, value):
     """Update a specific setting for a server."""
-    with open(DATA_FILE, "r") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            data = {}
-    
+    await update_many(guild_id, {key: value})
+
+async def update_many(guild_id, changes):
+    """Update several settings for a server in one write."""
+    global _cache_version
+    if not changes:
+        return
+    await _refresh(force=True)
+
     guild_id = str(guild_id)
-    if guild_id not in data:
-        data[guild_id] = {}
-    
-    data[guild_id][key] = value
-    
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
\ No newline at end of file
+    conf = dict(_cache.get(guild_id, {}))
+    conf.update(changes)
+    _cache[guild_id] = conf
+    _notify(guild_id)
+
+    if WRITE_BEHIND:
+        _dirty.add(guild_id)
+        _flush_stats["mutations"] += 1
+        _schedule_flush()
+    else:
+        # One backend write for the whole batch
+        _cache_version = await run_blocking(_save_configs_blocking, {guild_id: conf}, dict(_cache))
+
+class ConfigTransaction:
+    """
+    Collects config changes and writes them all at once on exit.
+
+    async with transaction(guild.id) as conf:
+        conf["log_join_id"] = join.id
+        conf["log_leave_id"] = leave.id
+    """
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.changes = {}
+
+    def __setitem__(self, key, value):
+        self.changes[key] = value
+
+    def __getitem__(self, key):
+        if key in self.changes:
+            return self.changes[key]
+        return _cache.get(str(self.guild_id), {})[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    async def __aenter__(self):
+        await get_config(self.guild_id)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Nothing is written if the block raised
+        if exc_type is None:
+            await update_many(self.guild_id, self.changes)
+        return False
+
+def transaction(guild_id):
+    return ConfigTransaction(guild_id)
+
+def cached_config(guild_id):
+    """Synchronous peek at a guild's config; None until the cache has been loaded."""
+    if not _loaded:
+        return None
+    return _cache.get(str(guild_id), {})
+
+def cached_configs():
+    """Synchronous peek at every config (read-only); None until the cache has been loaded."""
+    return _cache if _loaded else None
+
+async def ensure_loaded():
+    """Load the config cache if nothing has read it yet."""
+    if not _loaded:
+        await _refresh(force=True)
+
+def invalidate_cache():
+    """Drop the cache so the next lookup re-reads the backend."""
+    global _loaded
+    _loaded = False
+
+def cache_stats():
+    """Return hit/miss counters for the config cache."""
+    return {"hits": _stats["hits"], "misses": _stats["misses"], "guilds": len(_cache)}
+
+# ====================================================
+# 2. RESIDENT STORES
+# ====================================================
+# Other in-memory stores (clans, pending requests, ...) register here and are
+# flushed on the same schedule as the configs.
+_stores = []
+
+def register_store(store):
+    if store not in _stores:
+        _stores.append(store)
+
+async def request_flush():
+    """Called by stores after a change: flush later (write-behind) or right now."""
+    if WRITE_BEHIND:
+        _flush_stats["mutations"] += 1
+        _schedule_flush()
+    else:
+        await flush()
+
+class ResidentStore(abc.ABC):
+    """
+    Base for stores that keep records in memory and persist them per key.
+
+    Subclasses call `await self._changed(key, record)` (record=None deletes)
+    and implement `write_batch(backend, changed, deleted, all_records)`,
+    which runs on the storage thread.
+    """
+    def __init__(self):
+        # Serialized records (replaced, never mutated) + what changed since the last flush
+        self._records = {}
+        self._dirty = set()
+        self._deleted = set()
+
+    async def _changed(self, key, record):
+        key = str(key)
+        if record is None:
+            self._records.pop(key, None)
+            self._dirty.discard(key)
+            self._deleted.add(key)
+        else:
+            self._records[key] = record
+            self._dirty.add(key)
+            self._deleted.discard(key)
+        await request_flush()
+
+    @abc.abstractmethod
+    def write_batch(self, backend, changed, deleted, all_records):
+        """Persist one flush's changes (storage thread)."""
+
+    # --- Called by flush() ---
+    def has_pending(self):
+        return bool(self._dirty or self._deleted)
+
+    def take_pending(self):
+        """Snapshot pending changes on the event loop thread."""
+        snapshot = (
+            {key: self._records[key] for key in self._dirty},
+            set(self._deleted),
+            dict(self._records),
+        )
+        self._dirty.clear()
+        self._deleted.clear()
+        return snapshot
+
+    def write_pending(self, backend, snapshot):
+        self.write_batch(backend, *snapshot)
+
+    def restore_pending(self, snapshot):
+        """Re-queue a snapshot whose write failed."""
+        changed, deleted, _ = snapshot
+        self._dirty.update(key for key in changed if key in self._records)
+        self._deleted.update(key for key in deleted if key not in self._records)
+
+# ====================================================
+# 3. WRITE-BEHIND FLUSHING
+# ====================================================
+_dirty = set()
+_flush_task = None
+_flush_stats = {"flushes": 0, "mutations": 0, "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0}
+
+def _has_pending():
+    return bool(_dirty) or any(store.has_pending() for store in _stores)
+
+def _flush_blocking(changed, configs, store_snapshots):
+    backend = get_backend()
+    version = None
+    if changed:
+        backend.save_config_batch(changed, configs)
+        version = backend.version()
+    for store, snapshot in store_snapshots:
+        store.write_pending(backend, snapshot)
+    return version
+
+async def flush():
+    """Write every pending change to the backend now."""
+    global _cache_version
+    if not _has_pending():
+        return
+
+    changed = {gid: _cache[gid] for gid in _dirty if gid in _cache}
+    configs = dict(_cache)
+    store_snapshots = [(store, store.take_pending()) for store in _stores if store.has_pending()]
+    _dirty.clear()
+
+    start = time.perf_counter()
+    try:
+        version = await run_blocking(_flush_blocking, changed, configs, store_snapshots)
+    except Exception:
+        # Keep the changes so the next flush retries them
+        _dirty.update(changed)
+        for store, snapshot in store_snapshots:
+            store.restore_pending(snapshot)
+        raise
+
+    if version is not None:
+        _cache_version = version
+
+    elapsed = (time.perf_counter() - start) * 1000
+    _flush_stats["flushes"] += 1
+    _flush_stats["last_ms"] = elapsed
+    _flush_stats["max_ms"] = max(_flush_stats["max_ms"], elapsed)
+    _flush_stats["total_ms"] += elapsed
+
+async def _flush_later():
+    global _flush_task
+    try:
+        while _has_pending():
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await flush()
+            except Exception as e:
+                print(f"[Storage] Flush failed, will retry: {e}")
+    finally:
+        _flush_task = None
+
+def _schedule_flush():
+    global _flush_task
+    if _flush_task is None:
+        _flush_task = asyncio.get_running_loop().create_task(_flush_later())
+
+def flush_stats():
+    """Return write-behind counters (flush latency in milliseconds)."""
+    flushes = _flush_stats["flushes"]
+    return {
+        "flushes": flushes,
+        "mutations": _flush_stats["mutations"],
+        "pending_guilds": len(_dirty),
+        "last_ms": round(_flush_stats["last_ms"], 2),
+        "avg_ms": round(_flush_stats["total_ms"] / flushes, 2) if flushes else 0.0,
+        "max_ms": round(_flush_stats["max_ms"], 2),
+    }
+
+# ====================================================
+# 4. SHUTDOWN
+# ====================================================
+async def close():
+    """Flush pending changes, finish storage work and close the backend."""
+    if _flush_task is not None:
+        _flush_task.cancel()
+    await flush()
+    await run_blocking(_backend_call, "close")
+    _executor.shutdown(wait=True)
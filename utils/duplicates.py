@@ -0,0 +1,113 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict, deque
+
+# Defaults (per guild overrides: /setup antispam)
+DUP_MESSAGES = 5   # the same content this many times...
+DUP_SECONDS = 30   # ...within this many seconds, across all channels
+
+# Shorter content ("lol", "gg") is too common to be spam on its own
+MIN_LENGTH = 8
+
+# Hard cap on tracked (guild, content) keys; the least recently seen go first
+MAX_KEYS = 50_000
+
+# Messages collected for one cleanup batch, per key
+MAX_REFS = 500
+
+_NOISE_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+# Distinct user/role pings in one message that count as a mass mention
+MASS_MENTIONS = 4
+
+# Only content that can do harm when repeated counts: invites, mass pings and
+# links the automod filter blocks. Plain chat ("good morning", "happy birthday"),
+# a reply ping or an allowed link is often posted by many people at once
+_RAID_RE = re.compile(r"discord(?:\.gg|(?:app)?\.com/invite)/|@everyone|@here", re.IGNORECASE)
+_MENTION_RE = re.compile(r"<@[!&]?(\d+)>")
+
+def looks_like_raid(content, automod=None):
+    """Whether `content` is worth fingerprinting; `automod` is the guild's GuildFilter."""
+    if _RAID_RE.search(content):
+        return True
+    if len(set(_MENTION_RE.findall(content))) >= MASS_MENTIONS:
+        return True
+    return bool(automod and automod.blocked_link(content))
+
+def fingerprint(content):
+    """Hash of the message with case, spacing and punctuation removed, or None if too short."""
+    normalized = _NOISE_RE.sub("", content.casefold())
+    if len(normalized) < MIN_LENGTH:
+        return None
+    return hashlib.blake2b(normalized.encode(), digest_size=8).digest()
+
+class _Bucket:
+    __slots__ = ("times", "refs", "tripped", "last")
+
+    def __init__(self, limit):
+        self.times = deque(maxlen=limit)
+        self.refs = deque(maxlen=MAX_REFS)  # (channel id, message id, author id)
+        self.tripped = False
+        self.last = 0.0
+
+class DuplicateDetector:
+    """
+    Windowed counts of identical messages per (guild id, content hash).
+
+    Once a key crosses the threshold it stays "tripped" until it goes idle,
+    and every matching message is collected so the caller can clean them
+    all up in one batch.
+    """
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._stats = {"checked": 0, "tripped": 0, "evicted": 0}
+
+    def add(self, guild_id, digest, ref, limit, window, now=None):
+        """Count a message. Returns True if its content is (now) spam in this guild."""
+        now = time.monotonic() if now is None else now
+        key = (guild_id, digest)
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.times.maxlen != limit:
+            bucket = self._buckets[key] = _Bucket(limit)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self._stats["evicted"] += 1
+        else:
+            self._buckets.move_to_end(key)
+        self._stats["checked"] += 1
+
+        if bucket.tripped and now - bucket.last >= window:
+            # Quiet for a whole window: start counting again
+            bucket.tripped = False
+            bucket.times.clear()
+            bucket.refs.clear()
+        bucket.last = now
+        bucket.times.append(now)
+        bucket.refs.append(ref)
+
+        if not bucket.tripped and len(bucket.times) == limit and now - bucket.times[0] < window:
+            bucket.tripped = True
+            self._stats["tripped"] += 1
+        return bucket.tripped
+
+    def take(self, guild_id, digest):
+        """Messages collected for cleanup since the last take()."""
+        bucket = self._buckets.get((guild_id, digest))
+        if bucket is None:
+            return []
+        refs = list(bucket.refs)
+        bucket.refs.clear()
+        return refs
+
+    def sweep(self, max_age=600, now=None):
+        """Drop keys not seen for max_age seconds."""
+        now = time.monotonic() if now is None else now
+        idle = [key for key, bucket in self._buckets.items() if now - bucket.last >= max_age]
+        for key in idle:
+            del self._buckets[key]
+        return len(idle)
+
+    def stats(self):
+        return {**self._stats, "keys": len(self._buckets)}
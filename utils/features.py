@@ -0,0 +1,123 @@
+import enum
+from collections import Counter
+from utils import database
+
+class Feature(enum.IntFlag):
+    LOG_JOIN = enum.auto()
+    LOG_LEAVE = enum.auto()
+    LOG_MOD = enum.auto()
+    LOG_VOICE = enum.auto()
+    LOG_DELETE = enum.auto()
+    LOG_EDIT = enum.auto()
+    LOG_NICKNAME = enum.auto()
+    LOG_AVATAR = enum.auto()
+    LOG_ROLE = enum.auto()
+    WELCOME = enum.auto()
+    STREAM = enum.auto()
+
+# Config key -> the event it turns on
+FEATURE_KEYS = {
+    "log_join_id": Feature.LOG_JOIN,
+    "log_leave_id": Feature.LOG_LEAVE,
+    "log_mod_id": Feature.LOG_MOD,
+    "log_voice_id": Feature.LOG_VOICE,
+    "log_delete_id": Feature.LOG_DELETE,
+    "log_edit_id": Feature.LOG_EDIT,
+    "log_nickname_id": Feature.LOG_NICKNAME,
+    "log_avatar_id": Feature.LOG_AVATAR,
+    "log_role_id": Feature.LOG_ROLE,
+    "welcome_channel_id": Feature.WELCOME,
+    "stream_channel_id": Feature.STREAM,
+}
+
+# The main "log_channel" is the fallback for every log type
+ALL_LOGS = (Feature.LOG_JOIN | Feature.LOG_LEAVE | Feature.LOG_MOD | Feature.LOG_VOICE | Feature.LOG_DELETE
+            | Feature.LOG_EDIT | Feature.LOG_NICKNAME | Feature.LOG_AVATAR | Feature.LOG_ROLE)
+
+_masks = {}  # guild id (str) -> Feature
+_guilds = {feature: set() for feature in Feature}  # single feature -> guild ids (int) that enabled it
+_indexed = False
+_handled = Counter()  # Feature (possibly combined) -> events
+_skipped = Counter()
+
+def build_mask(conf):
+    mask = Feature(0)
+    if conf.get("log_channel"):
+        mask |= ALL_LOGS
+    for key, feature in FEATURE_KEYS.items():
+        if conf.get(key):
+            mask |= feature
+    return mask
+
+def _index_guild(guild_id, conf):
+    current = build_mask(conf)
+    for feature, guild_ids in _guilds.items():
+        if current & feature:
+            guild_ids.add(guild_id)
+        else:
+            guild_ids.discard(guild_id)
+
+def _reindex():
+    global _indexed
+    configs = database.cached_configs()
+    if configs is None:
+        return
+    for guild_ids in _guilds.values():
+        guild_ids.clear()
+    for guild_id, conf in configs.items():
+        _index_guild(int(guild_id), conf)
+    _indexed = True
+
+def _invalidate(guild_id):
+    # Masks are rebuilt lazily on the next event; the guild index right away
+    if guild_id is None:
+        _masks.clear()
+        _reindex()
+    else:
+        _masks.pop(str(guild_id), None)
+        if _indexed:
+            _index_guild(int(guild_id), database.cached_config(guild_id) or {})
+
+database.on_config_change(_invalidate)
+
+def mask(guild_id):
+    """The guild's enabled features, or None if configs aren't loaded yet."""
+    key = str(guild_id)
+    current = _masks.get(key)
+    if current is None:
+        conf = database.cached_config(guild_id)
+        if conf is None:
+            return None
+        current = _masks[key] = build_mask(conf)
+    return current
+
+def enabled(guild_id, feature):
+    """
+    Listener fast path: does this guild want any of `feature` at all?
+    Answers True until the config cache is loaded, so nothing is missed.
+    """
+    current = mask(guild_id)
+    if current is None or current & feature:
+        _handled[feature] += 1
+        return True
+    _skipped[feature] += 1
+    return False
+
+async def guilds_with(feature):
+    """Ids of the guilds that enabled a single feature (for events that fan out over guilds)."""
+    if not _indexed:
+        await database.ensure_loaded()
+        _reindex()
+    return _guilds[feature]
+
+def _label(feature):
+    # Combined flags have no .name before Python 3.11
+    return "|".join(single.name for single in Feature if single & feature)
+
+def stats():
+    """Handled/skipped event counts per feature name ("A|B" for combined checks)."""
+    return {
+        "handled": {_label(f): count for f, count in _handled.items()},
+        "skipped": {_label(f): count for f, count in _skipped.items()},
+        "guilds": len(_masks),
+    }
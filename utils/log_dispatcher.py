@@ -0,0 +1,156 @@
+import asyncio
+from collections import deque, Counter
+import discord
+import config
+from utils.outbound import outbound, NORMAL, LOW
+
+# Discord limits: 10 embeds per message, 6000 characters across all of them
+MAX_EMBEDS = 10
+MAX_CHARS = 6000
+
+# How long a channel's queue may wait for more embeds before it is sent anyway
+FLUSH_INTERVAL = 1.0
+
+# Low-priority logs a channel may have waiting before the overflow policy kicks in
+LOW_BACKLOG = getattr(config, "LOW_LOG_BACKLOG", 30)
+# Per-route policy for low-priority logs past the backlog: "summarize" or "drop"
+OVERFLOW_POLICY = getattr(config, "LOG_OVERFLOW_POLICY", {})
+
+class LogDispatcher:
+    """
+    Per-channel log queues. Embeds are packed up to 10 per message and sent
+    when a message is full or FLUSH_INTERVAL has passed, so a burst of 100
+    events costs 10 messages instead of 100.
+    """
+    def __init__(self, interval=FLUSH_INTERVAL):
+        self.interval = interval
+        self._queues = {}    # channel id -> deque of (priority, route, embed)
+        self._channels = {}  # channel id -> channel
+        self._full = {}      # channel id -> Event, set when a full message is waiting
+        self._workers = {}   # channel id -> Task
+        self._low = Counter()  # channel id -> low-priority entries waiting
+        self._skipped = {}   # channel id -> Counter of summarized routes
+        self._stats = {"queued": 0, "messages": 0, "embeds": 0, "failed": 0, "max_depth": 0, "dropped": 0}
+
+    def queue(self, channel, embed, route="log", priority=NORMAL):
+        """
+        Queue an embed for a log channel. Returns immediately.
+        Low-priority routes are dropped or summarized once the channel backs up.
+        """
+        channel_id = channel.id
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = deque()
+            self._full[channel_id] = asyncio.Event()
+        self._channels[channel_id] = channel
+
+        if priority >= LOW:
+            if self._low[channel_id] >= LOW_BACKLOG:
+                self._overflow(channel_id, route)
+                return
+            self._low[channel_id] += 1
+        queue.append((priority, route, embed))
+
+        self._stats["queued"] += 1
+        self._stats["max_depth"] = max(self._stats["max_depth"], len(queue))
+        if len(queue) >= MAX_EMBEDS:
+            self._full[channel_id].set()
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.get_running_loop().create_task(self._worker(channel_id))
+
+    def _overflow(self, channel_id, route):
+        self._stats["dropped"] += 1
+        outbound.record_dropped(route)
+        if OVERFLOW_POLICY.get(route, "summarize") == "summarize":
+            self._skipped.setdefault(channel_id, Counter())[route] += 1
+            if channel_id not in self._workers:
+                self._workers[channel_id] = asyncio.get_running_loop().create_task(self._worker(channel_id))
+
+    def _summary_embed(self, channel_id):
+        skipped = self._skipped.get(channel_id)
+        if not skipped:
+            return None
+        lines = [f"**{count}** × {route.removeprefix('log.')}" for route, count in skipped.most_common()]
+        return discord.Embed(
+            title="⏭️ Logs Skipped",
+            description="This channel was flooded, so some low-priority logs were left out:\n" + "\n".join(lines),
+            color=discord.Color.light_grey(),
+            timestamp=discord.utils.utcnow()
+        )
+
+    def _take_batch(self, channel_id):
+        """Pops up to one message worth of embeds. Returns (embeds, priority, route)."""
+        queue = self._queues[channel_id]
+        batch = []
+        chars = 0
+        priority, route = LOW, "log.summary"
+        while queue and len(batch) < MAX_EMBEDS:
+            entry_priority, entry_route, embed = queue[0]
+            size = len(embed)
+            if batch and chars + size > MAX_CHARS:
+                break
+            queue.popleft()
+            if entry_priority >= LOW:
+                self._low[channel_id] -= 1
+            if entry_priority < priority or not batch:
+                priority, route = entry_priority, entry_route
+            batch.append(embed)
+            chars += size
+
+        # Once the backlog has drained, tell the channel what was left out
+        if not queue and len(batch) < MAX_EMBEDS:
+            summary = self._summary_embed(channel_id)
+            if summary and chars + len(summary) <= MAX_CHARS:
+                batch.append(summary)
+                del self._skipped[channel_id]
+        return batch, priority, route
+
+    async def _send(self, channel_id, batch, priority, route):
+        channel = self._channels[channel_id]
+        try:
+            await outbound.run(route, priority, lambda: channel.send(embeds=batch), bucket=channel_id)
+            self._stats["messages"] += 1
+            self._stats["embeds"] += len(batch)
+        except discord.HTTPException as e:
+            self._stats["failed"] += len(batch)
+            print(f"[Logs] Could not send {len(batch)} log(s) to {channel_id}: {e}")
+
+    async def _worker(self, channel_id):
+        queue = self._queues[channel_id]
+        full = self._full[channel_id]
+        try:
+            while queue or self._skipped.get(channel_id):
+                if len(queue) < MAX_EMBEDS:
+                    try:
+                        await asyncio.wait_for(full.wait(), timeout=self.interval)
+                    except asyncio.TimeoutError:
+                        pass
+                full.clear()
+                batch, priority, route = self._take_batch(channel_id)
+                if batch:
+                    await self._send(channel_id, batch, priority, route)
+        finally:
+            # The next queue() call starts a new worker
+            self._workers.pop(channel_id, None)
+
+    async def flush_all(self):
+        """Send everything that is still queued (used on shutdown)."""
+        for worker in list(self._workers.values()):
+            worker.cancel()
+        for channel_id, queue in self._queues.items():
+            while queue or self._skipped.get(channel_id):
+                batch, priority, route = self._take_batch(channel_id)
+                await self._send(channel_id, batch, priority, route)
+
+    def stats(self):
+        """Queue depth and throughput counters."""
+        depths = {channel_id: len(q) for channel_id, q in self._queues.items() if q}
+        return {
+            **self._stats,
+            "depth": sum(depths.values()),
+            "busiest_channel": max(depths, key=depths.get) if depths else None,
+            "active_channels": len(self._workers),
+        }
+
+# Process-wide dispatcher shared by all logging cogs
+dispatcher = LogDispatcher()
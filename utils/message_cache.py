@@ -0,0 +1,131 @@
+from collections import OrderedDict
+import config
+
+# Memory budget for message snapshots (bytes, estimated): per guild, and for the
+# whole process so memory stays bounded however many guilds turn on delete/edit logs
+GUILD_BUDGET = getattr(config, "MESSAGE_CACHE_GUILD_KB", 512) * 1024
+TOTAL_BUDGET = getattr(config, "MESSAGE_CACHE_TOTAL_MB", 64) * 1024 * 1024
+
+# Once over TOTAL_BUDGET, free this much extra so the largest-guild scan isn't repeated on every message
+TOTAL_SLACK = 1 / 50
+
+# Rough fixed cost of one snapshot (object, ids, dict slot), on top of its text
+SNAPSHOT_OVERHEAD = 160
+
+class MessageSnapshot:
+    """What the delete/edit logs need to know about a message, and nothing else."""
+    __slots__ = ("id", "channel_id", "author_id", "content", "attachments", "size")
+
+    def __init__(self, message_id, channel_id, author_id, content, attachments):
+        self.id = message_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.content = content
+        self.attachments = attachments  # tuple of URLs
+        self.size = self._measure()
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(
+            message.id,
+            message.channel.id,
+            message.author.id,
+            message.content,
+            tuple(a.url for a in message.attachments)
+        )
+
+    def _measure(self):
+        return SNAPSHOT_OVERHEAD + len(self.content.encode()) + sum(len(url) for url in self.attachments)
+
+class MessageCache:
+    """
+    LRU of message snapshots with a byte budget per guild, so one busy guild
+    can't push everyone else's messages out, and a total budget that, when
+    hit, is taken from the guild using the most. Serves the raw delete/edit events.
+    """
+    def __init__(self, budget=GUILD_BUDGET, total_budget=TOTAL_BUDGET):
+        self.budget = budget
+        self.total_budget = total_budget
+        self._guilds = {}  # guild id -> OrderedDict(message id -> snapshot), oldest first
+        self._bytes = {}   # guild id -> bytes used
+        self._total = 0
+        self._stats = {"stored": 0, "evicted": 0, "hits": 0, "misses": 0}
+
+    def add(self, message):
+        guild_id = message.guild.id
+        snapshot = MessageSnapshot.from_message(message)
+        messages = self._guilds.get(guild_id)
+        if messages is None:
+            messages = self._guilds[guild_id] = OrderedDict()
+            self._bytes[guild_id] = 0
+        old = messages.pop(message.id, None)
+        if old:
+            self._resize(guild_id, -old.size)
+        messages[message.id] = snapshot
+        self._resize(guild_id, snapshot.size)
+        self._stats["stored"] += 1
+        self._evict(guild_id)
+
+    def _resize(self, guild_id, delta):
+        self._bytes[guild_id] += delta
+        self._total += delta
+
+    def _evict_oldest(self, guild_id, limit):
+        messages = self._guilds[guild_id]
+        while self._bytes[guild_id] > limit and messages:
+            _, snapshot = messages.popitem(last=False)
+            self._resize(guild_id, -snapshot.size)
+            self._stats["evicted"] += 1
+
+    def _evict(self, guild_id):
+        self._evict_oldest(guild_id, self.budget)
+        if self._total <= self.total_budget:
+            return
+        target = self.total_budget * (1 - TOTAL_SLACK)
+        while self._total > target:
+            largest = max(self._bytes, key=self._bytes.get)
+            if not self._bytes[largest]:
+                break
+            self._evict_oldest(largest, max(self._bytes[largest] - (self._total - target), 0))
+
+    def get(self, guild_id, message_id):
+        snapshot = self._guilds.get(guild_id, {}).get(message_id)
+        self._stats["hits" if snapshot else "misses"] += 1
+        return snapshot
+
+    def pop(self, guild_id, message_id):
+        messages = self._guilds.get(guild_id)
+        snapshot = messages.pop(message_id, None) if messages else None
+        if snapshot:
+            self._resize(guild_id, -snapshot.size)
+        self._stats["hits" if snapshot else "misses"] += 1
+        return snapshot
+
+    def edit(self, guild_id, message_id, content):
+        """Store the new content. Returns the previous content, or None if not cached."""
+        messages = self._guilds.get(guild_id)
+        snapshot = messages.get(message_id) if messages else None
+        if snapshot is None:
+            return None
+        before = snapshot.content
+        self._resize(guild_id, -snapshot.size)
+        snapshot.content = content
+        snapshot.size = snapshot._measure()
+        self._resize(guild_id, snapshot.size)
+        messages.move_to_end(message_id)
+        self._evict(guild_id)
+        return before
+
+    def forget_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+        self._total -= self._bytes.pop(guild_id, 0)
+
+    def stats(self):
+        return {
+            **self._stats,
+            "messages": sum(len(m) for m in self._guilds.values()),
+            "bytes": self._total,
+        }
+
+# Process-wide cache, filled by the logging cog
+snapshots = MessageCache()
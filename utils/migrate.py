@@ -0,0 +1,40 @@
+"""
+One-shot import of the JSON data files into the SQLite backend.
+
+Usage:
+    python -m utils.migrate            # import once (skips if already done)
+    python -m utils.migrate --force    # import again, overwriting matching rows
+"""
+import sys
+import datetime
+from utils.storage import JsonBackend, SqliteBackend
+
+MIGRATION_KEY = "migrated_from_json"
+
+def migrate(force=False, source=None, target=None):
+    source = source or JsonBackend()
+    target = target or SqliteBackend()
+
+    done = target.get_meta(MIGRATION_KEY)
+    if done and not force:
+        print(f"⏭️ Already migrated on {done}. Use --force to import again.")
+        return False
+
+    configs = source.load_configs()
+    clans = source.load_clans()
+    pending = source.load_pending()
+    voice_stats = source.load_voice_stats()
+
+    target.save_configs(configs)
+    with target.conn:
+        for channel_id, clan in clans.items():
+            target._upsert_clan(channel_id, clan)
+    target.save_pending_batch(pending, set(), pending)
+    target.save_voice_batch(voice_stats, set(), voice_stats)
+    target.set_meta(MIGRATION_KEY, datetime.datetime.now(datetime.timezone.utc).isoformat())
+
+    print(f"✅ Imported {len(configs)} server configs and {len(clans)} clans into {target.path}")
+    return True
+
+if __name__ == "__main__":
+    migrate(force="--force" in sys.argv[1:])
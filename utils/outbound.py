@@ -0,0 +1,187 @@
+import asyncio
+import itertools
+import time
+import discord
+
+# ====================================================
+# PRIORITY CLASSES (lower number runs first)
+# ====================================================
+CRITICAL = 0  # Moderation actions, automod deletions/timeouts: run immediately
+HIGH = 1      # Things people are waiting for: stream alerts, welcomes, DMs
+NORMAL = 2    # Regular logs (joins, leaves, deletes, mod logs), status edits
+LOW = 3       # Chatty logs (voice moves, roles, nicknames, avatars)
+
+PRIORITY_NAMES = {CRITICAL: "critical", HIGH: "high", NORMAL: "normal", LOW: "low"}
+
+# Max queued calls per class in one bucket; callers of run() wait for room (backpressure)
+QUEUE_LIMITS = {HIGH: 200, NORMAL: 500, LOW: 200}
+
+# Calls in flight per bucket (a channel, a DM, or a route). discord.py sleeps
+# inside the request when a bucket is rate limited, so a slow channel only
+# ever holds its own workers, never anyone else's
+BUCKET_WORKERS = 2
+
+class _Bucket:
+    __slots__ = ("queue", "room", "depth", "workers")
+
+    def __init__(self):
+        self.queue = asyncio.PriorityQueue()
+        self.room = asyncio.Condition()
+        self.depth = {p: 0 for p in PRIORITY_NAMES}
+        self.workers = 0
+
+    def idle(self):
+        return self.workers == 0 and not any(self.depth.values())
+
+class OutboundScheduler:
+    """
+    Outbound Discord REST calls, queued per bucket.
+
+    CRITICAL calls bypass the queues entirely. Everything else waits in its
+    bucket's priority queue, so inside one channel a flood of voice logs
+    can't delay a stream alert, and a channel stuck on its rate limit can't
+    delay any other channel. None of it can delay a ban.
+    """
+    def __init__(self, workers=BUCKET_WORKERS, limits=None):
+        self.worker_count = workers
+        self.limits = {**QUEUE_LIMITS, **(limits or {})}
+        self._buckets = {}  # bucket key -> _Bucket
+        self._seq = itertools.count()
+        self._routes = {}
+        self._workers = set()  # running worker tasks, so none can be garbage collected
+
+    # --- STATS ---
+    def _route(self, route):
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {"sent": 0, "failed": 0, "dropped": 0, "wait_ms": 0.0, "max_wait_ms": 0.0}
+        return stats
+
+    def _record(self, route, waited, ok):
+        stats = self._route(route)
+        stats["sent" if ok else "failed"] += 1
+        waited *= 1000
+        stats["wait_ms"] += waited
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], waited)
+
+    def record_dropped(self, route, count=1):
+        self._route(route)["dropped"] += count
+
+    def stats(self):
+        """Queue depth per class (all buckets), active buckets and per-route counters (average/max queue wait in ms)."""
+        routes = {}
+        for route, s in self._routes.items():
+            done = s["sent"] + s["failed"]
+            routes[route] = {
+                "sent": s["sent"],
+                "failed": s["failed"],
+                "dropped": s["dropped"],
+                "avg_wait_ms": round(s["wait_ms"] / done, 2) if done else 0.0,
+                "max_wait_ms": round(s["max_wait_ms"], 2),
+            }
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for bucket in self._buckets.values():
+            for p, d in bucket.depth.items():
+                depth[PRIORITY_NAMES[p]] += d
+        return {"depth": depth, "buckets": len(self._buckets), "routes": routes}
+
+    # --- RUNNING CALLS ---
+    async def run(self, route, priority, factory, bucket=None):
+        """
+        Run `factory()` (a coroutine function making one REST call) at the
+        given priority and return its result. Exceptions are re-raised.
+        `bucket` groups calls that share a rate limit (usually a channel id);
+        it defaults to the route.
+        """
+        if priority == CRITICAL:
+            try:
+                result = await factory()
+            except Exception:
+                self._record(route, 0.0, False)
+                raise
+            self._record(route, 0.0, True)
+            return result
+
+        key = route if bucket is None else bucket
+        state = self._buckets.get(key)
+        if state is None:
+            state = self._buckets[key] = _Bucket()
+        limit = self.limits.get(priority)
+        async with state.room:
+            await state.room.wait_for(lambda: limit is None or state.depth[priority] < limit)
+            state.depth[priority] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        state.queue.put_nowait((priority, next(self._seq), route, factory, future, time.monotonic()))
+        if state.workers < self.worker_count:
+            state.workers += 1
+            task = asyncio.get_running_loop().create_task(self._worker(key, state))
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+        return await future
+
+    async def _worker(self, key, state):
+        try:
+            while not state.queue.empty():
+                priority, _, route, factory, future, queued_at = state.queue.get_nowait()
+                waited = time.monotonic() - queued_at
+                try:
+                    if not future.cancelled():
+                        result = await factory()
+                        if not future.done():
+                            future.set_result(result)
+                        self._record(route, waited, True)
+                except Exception as e:
+                    self._record(route, waited, False)
+                    if not future.done():
+                        future.set_exception(e)
+                finally:
+                    # The worker itself was cancelled: don't leave the caller waiting forever
+                    if not future.done():
+                        future.cancel()
+                    state.depth[priority] -= 1
+                    async with state.room:
+                        state.room.notify_all()
+        finally:
+            state.workers -= 1
+            if state.workers == 0:
+                # Only reached with calls left if the last worker was cancelled (shutdown)
+                while not state.queue.empty():
+                    priority, _, _, _, future, _ = state.queue.get_nowait()
+                    future.cancel()
+                    state.depth[priority] -= 1
+                async with state.room:
+                    state.room.notify_all()
+            # Idle buckets are forgotten; the next run() makes a new one
+            if state.idle() and self._buckets.get(key) is state:
+                del self._buckets[key]
+
+# Process-wide scheduler
+outbound = OutboundScheduler()
+
+async def send(route, priority, channel, *args, **kwargs):
+    """Shortcut: channel.send(...) through the scheduler, in the channel's bucket."""
+    return await outbound.run(route, priority, lambda: channel.send(*args, **kwargs), bucket=channel.id)
+
+async def send_quietly(route, priority, channel, *args, **kwargs):
+    """Like send(), but a failed send is only logged (for fire-and-forget notices)."""
+    try:
+        return await send(route, priority, channel, *args, **kwargs)
+    except discord.HTTPException as e:
+        print(f"[Outbound] {route} failed: {e}")
+
+# Fire-and-forget calls; kept here so a running task can't be garbage collected
+_background = set()
+
+def fire(route, priority, factory, bucket=None):
+    """Schedule a call without waiting for it. Failures are only logged. Returns the Task."""
+    async def call():
+        try:
+            await outbound.run(route, priority, factory, bucket)
+        except discord.HTTPException as e:
+            print(f"[Outbound] {route} failed: {e}")
+
+    task = asyncio.get_running_loop().create_task(call())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
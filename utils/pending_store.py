@@ -0,0 +1,63 @@
+import time
+from utils import database
+from utils.storage import get_backend
+
+# Requests nobody answered are dropped after this many seconds (7 days)
+PENDING_TTL = 7 * 24 * 3600
+
+class PendingStore(database.ResidentStore):
+    """
+    Open clan requests (creation, application, transfer), keyed by the id of
+    the message that carries the buttons. Button callbacks do one dict lookup
+    here instead of parsing the embed.
+    """
+    def __init__(self):
+        super().__init__()
+        self.loaded = False
+        # Requests answered since startup (so a stale embed can't bring them back)
+        self._handled = set()
+
+    async def load(self):
+        if self.loaded:
+            return
+        self._records = await database.run_blocking(lambda: get_backend().load_pending())
+        self.loaded = True
+        database.register_store(self)
+
+    def get(self, message_id, kind=None):
+        record = self._records.get(str(message_id))
+        if record and kind and record["kind"] != kind:
+            return None
+        return record
+
+    async def add(self, message_id, kind, guild_id, **data):
+        self._handled.discard(str(message_id))
+        record = {"kind": kind, "guild_id": guild_id, "created_at": time.time(), **data}
+        await self._changed(message_id, record)
+        return record
+
+    async def remove(self, message_id):
+        self._handled.add(str(message_id))
+        if str(message_id) in self._records:
+            await self._changed(message_id, None)
+
+    def was_handled(self, message_id):
+        return str(message_id) in self._handled
+
+    async def expire(self, max_age=PENDING_TTL):
+        """Drop requests older than max_age seconds. Returns how many were removed."""
+        cutoff = time.time() - max_age
+        expired = [key for key, record in self._records.items() if record["created_at"] < cutoff]
+        for key in expired:
+            await self._changed(key, None)
+        return len(expired)
+
+    def __len__(self):
+        return len(self._records)
+
+    # --- PERSISTENCE (storage thread) ---
+    def write_batch(self, backend, changed, deleted, all_records):
+        backend.save_pending_batch(changed, deleted, all_records)
+
+# Process-wide store, loaded by the clan cog
+pending = PendingStore()
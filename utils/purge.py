@@ -0,0 +1,117 @@
+import asyncio
+import datetime
+import discord
+from utils.outbound import outbound, CRITICAL
+
+# Discord only bulk-deletes messages younger than 14 days; leave a margin
+# so a message can't cross the line while a long purge is running
+BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=10)
+BULK_SIZE = 100
+
+# Older messages are deleted one at a time; pause between them so a big
+# purge doesn't spend the whole bot's rate limit on one channel (seconds)
+OLD_DELETE_DELAY = 1.0
+
+class PurgeJob:
+    """
+    Streams a channel's history (newest first) and deletes every message
+    that passes `check` while the next page is still loading:
+
+    - recent messages go out in full 100-message bulk deletes
+    - messages past the bulk-delete age go to a separate, paced lane
+
+    Every message is written to the transcript before it is deleted.
+    """
+    def __init__(self, channel, transcript, check=None):
+        self.channel = channel
+        self.transcript = transcript
+        self.check = check
+        self.scanned = 0
+        self.matched = 0
+        self.deleted = 0
+        self.failed = 0
+        self.old_queued = 0
+        self.done = False
+        self._cutoff = discord.utils.utcnow() - BULK_MAX_AGE
+        # Small bound: history reading stays at most a couple of batches ahead of deleting
+        self._bulk = asyncio.Queue(maxsize=2)
+        self._old = asyncio.Queue()
+
+    async def run(self, history):
+        tasks = [
+            asyncio.create_task(self._produce(history)),
+            asyncio.create_task(self._bulk_worker()),
+            asyncio.create_task(self._old_worker())
+        ]
+        try:
+            # If a worker dies, stop the reader too instead of letting it wait on a full queue
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception():
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.done = True
+
+    async def _produce(self, history):
+        batch = []
+        async for message in history:
+            self.scanned += 1
+            if self.check and not self.check(message):
+                continue
+            self.matched += 1
+            if message.created_at > self._cutoff:
+                batch.append(message)
+                if len(batch) == BULK_SIZE:
+                    await self._queue_bulk(batch)
+                    batch = []
+            else:
+                # Newest first: everything from here on is too old to bulk delete
+                if batch:
+                    await self._queue_bulk(batch)
+                    batch = []
+                self._keep([message])
+                self.old_queued += 1
+                self._old.put_nowait(message)
+        if batch:
+            await self._queue_bulk(batch)
+        await self._bulk.put(None)
+        self._old.put_nowait(None)
+
+    def _keep(self, messages):
+        self.transcript.claim(messages)
+        self.transcript.add(messages)
+
+    async def _queue_bulk(self, batch):
+        self._keep(batch)
+        await self._bulk.put(batch)
+
+    async def _bulk_worker(self):
+        while (batch := await self._bulk.get()) is not None:
+            try:
+                await outbound.run("mod.purge", CRITICAL, lambda: self.channel.delete_messages(batch))
+                self.deleted += len(batch)
+            except discord.HTTPException as e:
+                print(f"[Purge] Bulk delete failed in {self.channel.id}: {e}")
+                self.failed += len(batch)
+
+    async def _old_worker(self):
+        while (message := await self._old.get()) is not None:
+            try:
+                await outbound.run("mod.purge.old", CRITICAL, message.delete)
+                self.deleted += 1
+            except discord.NotFound:
+                self.deleted += 1  # Already gone
+            except discord.HTTPException:
+                self.failed += 1
+            self.old_queued -= 1
+            await asyncio.sleep(OLD_DELETE_DELAY)
+
+    def progress(self):
+        text = f"🧹 Scanned **{self.scanned}** • Matched **{self.matched}** • Deleted **{self.deleted}**"
+        if self.old_queued:
+            text += f"\n🐢 {self.old_queued} message(s) older than 14 days left (deleted one at a time)"
+        if self.failed:
+            text += f"\n⚠️ {self.failed} could not be deleted"
+        return text
@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from utils import database
+from utils.ratelimit import SlidingWindow
+
+# Defaults (per guild overrides: /setup raid)
+RAID_JOINS = 10     # this many joins...
+RAID_SECONDS = 10   # ...within this many seconds starts raid mode
+
+# Raid mode ends after this many seconds without a join
+RAID_CALM = 120
+
+# Joins remembered per guild (to build the cohort when raid mode starts)
+RECENT_JOINS = 1000
+
+class RaidState:
+    """One guild's ongoing raid: who joined, and what hasn't been summarized yet."""
+    __slots__ = ("started", "last_join", "cohort", "unreported", "announced", "actioned")
+
+    def __init__(self, now):
+        self.started = now
+        self.last_join = now
+        self.cohort = {}       # member id -> None (insertion ordered set)
+        self.unreported = []   # member ids since the last summary
+        self.announced = False
+        self.actioned = set()  # member ids already hit by /raid action
+
+    def add(self, member_id, now):
+        self.last_join = now
+        if member_id not in self.cohort:
+            self.cohort[member_id] = None
+            self.unreported.append(member_id)
+
+    def take_unreported(self):
+        ids, self.unreported = self.unreported, []
+        return ids
+
+class RaidMonitor:
+    """
+    Per-guild join rate. When joins cross the threshold the guild goes into
+    raid mode: every join from the window that tripped it, and every join
+    after, becomes part of the cohort until the guild has been calm for a while.
+    """
+    def __init__(self):
+        self.joins = SlidingWindow()
+        self._recent = {}  # guild id -> OrderedDict member id -> join time
+        self._raids = {}   # guild id -> RaidState
+
+    def record_join(self, member, now=None):
+        """
+        Count a join. Safe to call from several listeners for the same event:
+        only the first call counts. Returns the guild's RaidState, or None.
+        """
+        now = time.monotonic() if now is None else now
+        guild_id = member.guild.id
+        recent = self._recent.setdefault(guild_id, OrderedDict())
+        if member.id in recent:
+            return self._raids.get(guild_id)
+
+        conf = database.cached_config(guild_id) or {}
+        window = conf.get("raid_seconds", RAID_SECONDS)
+        recent[member.id] = now
+        while len(recent) > RECENT_JOINS or now - next(iter(recent.values())) > max(window, RAID_CALM):
+            recent.popitem(last=False)
+
+        raid = self._raids.get(guild_id)
+        if raid is not None:
+            raid.add(member.id, now)
+            return raid
+        if not conf.get("raid_enabled", True):
+            return None
+        if self.joins.hit(guild_id, conf.get("raid_joins", RAID_JOINS), window, now):
+            raid = self._raids[guild_id] = RaidState(now)
+            for member_id, joined in recent.items():
+                if now - joined < window:
+                    raid.add(member_id, now)
+            return raid
+        return None
+
+    def active(self, guild_id):
+        return self._raids.get(guild_id)
+
+    def items(self):
+        return list(self._raids.items())
+
+    def end(self, guild_id):
+        """Leave raid mode. Returns the finished RaidState, or None."""
+        self.joins.reset(guild_id)
+        return self._raids.pop(guild_id, None)
+
+    def expire(self, calm=RAID_CALM, now=None):
+        """End raids with no joins for `calm` seconds. Returns [(guild id, RaidState)]."""
+        now = time.monotonic() if now is None else now
+        ended = [(guild_id, raid) for guild_id, raid in self._raids.items() if now - raid.last_join >= calm]
+        for guild_id, _ in ended:
+            self.end(guild_id)
+        # Guilds with no recent joins don't need their join history
+        for guild_id in [g for g, recent in self._recent.items() if now - next(reversed(recent.values())) >= RAID_CALM]:
+            del self._recent[guild_id]
+        self.joins.sweep(now)
+        return ended
+
+raids = RaidMonitor()
@@ -0,0 +1,51 @@
+import time
+from collections import deque
+
+# Keys with no hits for this long are dropped by sweep() (seconds)
+IDLE_AFTER = 300.0
+
+class SlidingWindow:
+    """
+    Sliding-window rate limiter keyed by (guild id, user id).
+
+    Each key keeps at most `limit` timestamps in a fixed-size deque, so a hit
+    is O(1) no matter how chatty the user is: the oldest timestamp falls out
+    on its own, and the limit is reached when the oldest of the last `limit`
+    hits is still inside the window.
+    """
+    def __init__(self, idle_after=IDLE_AFTER):
+        self.idle_after = idle_after
+        self._hits = {}
+        self._stats = {"hits": 0, "triggered": 0, "swept": 0}
+
+    def hit(self, key, limit, window, now=None):
+        """Record a hit. Returns True if `limit` hits landed within `window` seconds."""
+        now = time.monotonic() if now is None else now
+        hits = self._hits.get(key)
+        if hits is None or hits.maxlen != limit:
+            # New key, or the guild changed its threshold
+            hits = self._hits[key] = deque(hits or (), maxlen=limit)
+        hits.append(now)
+        self._stats["hits"] += 1
+        if len(hits) == limit and now - hits[0] < window:
+            self._stats["triggered"] += 1
+            return True
+        return False
+
+    def reset(self, key):
+        self._hits.pop(key, None)
+
+    def sweep(self, now=None):
+        """Drop keys that have been idle for idle_after seconds. Returns how many were removed."""
+        now = time.monotonic() if now is None else now
+        idle = [key for key, hits in self._hits.items() if now - hits[-1] >= self.idle_after]
+        for key in idle:
+            del self._hits[key]
+        self._stats["swept"] += len(idle)
+        return len(idle)
+
+    def __len__(self):
+        return len(self._hits)
+
+    def stats(self):
+        return {**self._stats, "keys": len(self._hits)}
@@ -0,0 +1,336 @@
+import json
+import os
+import sqlite3
+import tempfile
+import config
+
+DATA_DIR = "data"
+CONFIG_FILE = os.path.join(DATA_DIR, "server_configs.json")
+CLAN_FILE = "clans.json"
+PENDING_FILE = os.path.join(DATA_DIR, "pending_requests.json")
+VOICE_FILE = os.path.join(DATA_DIR, "voice_stats.json")
+
+if not os.path.exists(DATA_DIR):
+    os.makedirs(DATA_DIR)
+
+# ====================================================
+# 1. JSON BACKEND (Default, small installs)
+# ====================================================
+# Read once at import: os.umask() can only be read by setting it, which
+# isn't safe once the storage thread is creating files
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _file_mode(path):
+    """Permission bits of an existing file, or the umask default for a new one."""
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+class JsonBackend:
+    name = "json"
+
+    def __init__(self, config_file=CONFIG_FILE, clan_file=CLAN_FILE, pending_file=PENDING_FILE, voice_file=VOICE_FILE):
+        self.config_file = config_file
+        self.clan_file = clan_file
+        self.pending_file = pending_file
+        self.voice_file = voice_file
+        if not os.path.exists(self.config_file):
+            self._write(self.config_file, {})
+
+    def _read(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, path, data):
+        """Atomic write: temp file + fsync + os.replace, so a crash never leaves a torn file."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp creates 0600 files; keep the permissions the file had (or would get)
+            os.chmod(tmp_path, _file_mode(path))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Make the rename itself durable
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(directory, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    # --- CONFIGS ---
+    def version(self):
+        """Changes whenever the config file is modified on disk."""
+        try:
+            st = os.stat(self.config_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def load_configs(self):
+        return self._read(self.config_file)
+
+    def save_configs(self, configs):
+        self._write(self.config_file, configs)
+
+    def save_config(self, guild_id, conf):
+        configs = self.load_configs()
+        configs[str(guild_id)] = conf
+        self.save_configs(configs)
+
+    def save_config_batch(self, changed, configs):
+        # The JSON file is one document, so any change rewrites all of it
+        self.save_configs(configs)
+
+    # --- CLANS ---
+    def load_clans(self):
+        return self._read(self.clan_file)
+
+    def save_clans(self, clans):
+        self._write(self.clan_file, clans)
+
+    def save_clan(self, channel_id, clan):
+        clans = self.load_clans()
+        clans[str(channel_id)] = clan
+        self.save_clans(clans)
+
+    def delete_clan(self, channel_id):
+        clans = self.load_clans()
+        if clans.pop(str(channel_id), None) is not None:
+            self.save_clans(clans)
+
+    def save_clan_batch(self, changed, deleted, all_clans):
+        # Same as configs: one document, so write the full snapshot
+        self.save_clans(all_clans)
+
+    # --- PENDING REQUESTS ---
+    def load_pending(self):
+        return self._read(self.pending_file)
+
+    def save_pending_batch(self, changed, deleted, all_pending):
+        self._write(self.pending_file, all_pending)
+
+    # --- VOICE STATS ---
+    def load_voice_stats(self):
+        return self._read(self.voice_file)
+
+    def save_voice_batch(self, changed, deleted, all_stats):
+        self._write(self.voice_file, all_stats)
+
+    def backup_path(self):
+        return self.clan_file if os.path.exists(self.clan_file) else None
+
+    def close(self):
+        pass
+
+# ====================================================
+# 2. SQLITE BACKEND (WAL mode, per-row writes)
+# ====================================================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_configs (
+    guild_id INTEGER PRIMARY KEY,
+    data     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clans (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id   INTEGER,
+    name       TEXT NOT NULL,
+    leader_id  INTEGER NOT NULL,
+    role_id    INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_clans_guild ON clans (guild_id);
+CREATE INDEX IF NOT EXISTS idx_clans_guild_name ON clans (guild_id, name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS clan_members (
+    channel_id INTEGER NOT NULL REFERENCES clans (channel_id) ON DELETE CASCADE,
+    member_id  INTEGER NOT NULL,
+    PRIMARY KEY (channel_id, member_id)
+);
+CREATE INDEX IF NOT EXISTS idx_clan_members_member ON clan_members (member_id);
+CREATE TABLE IF NOT EXISTS pending_requests (
+    message_id INTEGER PRIMARY KEY,
+    kind       TEXT NOT NULL,
+    guild_id   INTEGER,
+    created_at REAL NOT NULL,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pending_created ON pending_requests (created_at);
+CREATE TABLE IF NOT EXISTS voice_stats (
+    guild_id INTEGER PRIMARY KEY,
+    data     TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class SqliteBackend:
+    name = "sqlite"
+
+    def __init__(self, path=None):
+        self.path = path or config.SQLITE_PATH
+        # One connection, used from one thread at a time (see utils/database.py)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # --- CONFIGS ---
+    def version(self):
+        """Changes whenever another connection commits to the database."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_configs(self):
+        rows = self.conn.execute("SELECT guild_id, data FROM guild_configs")
+        return {str(gid): json.loads(data) for gid, data in rows}
+
+    def save_configs(self, configs):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO guild_configs (guild_id, data) VALUES (?, ?)",
+                [(int(gid), json.dumps(conf)) for gid, conf in configs.items()]
+            )
+
+    def save_config(self, guild_id, conf):
+        self.save_configs({guild_id: conf})
+
+    def save_config_batch(self, changed, configs):
+        # Only the changed rows, in one transaction
+        self.save_configs(changed)
+
+    # --- CLANS ---
+    def load_clans(self):
+        clans = {}
+        rows = self.conn.execute("SELECT channel_id, guild_id, name, leader_id, role_id FROM clans")
+        for channel_id, guild_id, name, leader_id, role_id in rows:
+            clans[str(channel_id)] = {
+                "name": name,
+                "guild_id": guild_id,
+                "leader_id": leader_id,
+                "channel_id": channel_id,
+                "role_id": role_id,
+                "members": []
+            }
+        for channel_id, member_id in self.conn.execute("SELECT channel_id, member_id FROM clan_members"):
+            clan = clans.get(str(channel_id))
+            if clan:
+                clan["members"].append(member_id)
+        return clans
+
+    def _upsert_clan(self, channel_id, clan):
+        channel_id = int(channel_id)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO clans (channel_id, guild_id, name, leader_id, role_id) VALUES (?, ?, ?, ?, ?)",
+            (channel_id, clan.get("guild_id"), clan["name"], clan["leader_id"], clan.get("role_id"))
+        )
+        self.conn.execute("DELETE FROM clan_members WHERE channel_id = ?", (channel_id,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO clan_members (channel_id, member_id) VALUES (?, ?)",
+            [(channel_id, int(m)) for m in clan.get("members", [])]
+        )
+
+    def save_clan(self, channel_id, clan):
+        with self.conn:
+            self._upsert_clan(channel_id, clan)
+
+    def save_clans(self, clans):
+        with self.conn:
+            existing = {row[0] for row in self.conn.execute("SELECT channel_id FROM clans")}
+            for channel_id in existing - {int(c) for c in clans}:
+                self.conn.execute("DELETE FROM clans WHERE channel_id = ?", (channel_id,))
+            for channel_id, clan in clans.items():
+                self._upsert_clan(channel_id, clan)
+
+    def delete_clan(self, channel_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM clans WHERE channel_id = ?", (int(channel_id),))
+
+    def save_clan_batch(self, changed, deleted, all_clans):
+        # Only the touched clans, in one transaction
+        with self.conn:
+            self.conn.executemany("DELETE FROM clans WHERE channel_id = ?", [(int(c),) for c in deleted])
+            for channel_id, clan in changed.items():
+                self._upsert_clan(channel_id, clan)
+
+    # --- PENDING REQUESTS ---
+    def load_pending(self):
+        rows = self.conn.execute("SELECT message_id, data FROM pending_requests")
+        return {str(message_id): json.loads(data) for message_id, data in rows}
+
+    def save_pending_batch(self, changed, deleted, all_pending):
+        with self.conn:
+            self.conn.executemany("DELETE FROM pending_requests WHERE message_id = ?", [(int(m),) for m in deleted])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO pending_requests (message_id, kind, guild_id, created_at, data) VALUES (?, ?, ?, ?, ?)",
+                [(int(m), r["kind"], r.get("guild_id"), r["created_at"], json.dumps(r)) for m, r in changed.items()]
+            )
+
+    # --- VOICE STATS ---
+    def load_voice_stats(self):
+        rows = self.conn.execute("SELECT guild_id, data FROM voice_stats")
+        return {str(guild_id): json.loads(data) for guild_id, data in rows}
+
+    def save_voice_batch(self, changed, deleted, all_stats):
+        with self.conn:
+            self.conn.executemany("DELETE FROM voice_stats WHERE guild_id = ?", [(int(g),) for g in deleted])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO voice_stats (guild_id, data) VALUES (?, ?)",
+                [(int(g), json.dumps(stats)) for g, stats in changed.items()]
+            )
+
+    # --- META ---
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def backup_path(self):
+        """Write a consistent snapshot (safe while the bot is running) and return its path."""
+        path = os.path.join(DATA_DIR, "backup.sqlite3")
+        target = sqlite3.connect(path)
+        try:
+            self.conn.backup(target)
+        finally:
+            target.close()
+        return path
+
+    def close(self):
+        self.conn.close()
+
+# ====================================================
+# 3. BACKEND SELECTION
+# ====================================================
+BACKENDS = {
+    "json": JsonBackend,
+    "sqlite": SqliteBackend,
+}
+
+_backend = None
+
+def get_backend():
+    """Return the process-wide backend chosen by config.STORAGE_BACKEND."""
+    global _backend
+    if _backend is None:
+        name = getattr(config, "STORAGE_BACKEND", "json").lower()
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown STORAGE_BACKEND '{name}' (expected one of: {', '.join(BACKENDS)})")
+        _backend = BACKENDS[name]()
+    return _backend
@@ -0,0 +1,83 @@
+import asyncio
+import gzip
+import tempfile
+import discord
+
+# How long purged message ids stay claimed after a purge ends; delete events
+# can arrive a little after the REST call that caused them returns
+CLAIM_GRACE = 30.0
+
+# channel id -> ids of messages being removed by a transcript-logged bulk delete
+_claimed = {}
+
+class Transcript:
+    """
+    Gzip transcript of a bulk delete, written to a temp file batch by batch
+    while the messages are being deleted, then uploaded once at the end.
+    """
+    def __init__(self, channel, moderator, action="Purge"):
+        self.channel = channel
+        self.moderator = moderator
+        self.action = action
+        self.count = 0
+        self.ids = set()
+        self.started = discord.utils.utcnow()
+        self._file = tempfile.TemporaryFile()
+        self._gzip = gzip.GzipFile(filename="transcript.txt", mode="wb", fileobj=self._file)
+        self._line(f"{action} in #{channel.name} ({channel.id}) by {moderator} ({moderator.id})")
+        self._line(f"Started {self.started:%Y-%m-%d %H:%M:%S} UTC, newest messages first")
+        self._line("")
+
+    def _line(self, text):
+        self._gzip.write(text.encode() + b"\n")
+
+    def claim(self, messages):
+        """Mark messages as part of this purge before deleting them (so the delete logs skip them)."""
+        ids = {m.id for m in messages}
+        self.ids |= ids
+        claim(self.channel.id, ids)
+
+    def add(self, messages):
+        for message in messages:
+            line = f"[{message.created_at:%Y-%m-%d %H:%M:%S}] {message.author} ({message.author.id}): {message.content}"
+            if message.attachments:
+                line += " [attachments: " + ", ".join(a.url for a in message.attachments) + "]"
+            if message.embeds:
+                line += f" [{len(message.embeds)} embed(s)]"
+            self._line(line)
+            self.count += 1
+
+    def to_file(self):
+        """Finish the gzip stream and return it as an upload."""
+        self._gzip.close()
+        self._file.seek(0)
+        name = f"{self.action.lower().replace(' ', '_')}_{self.channel.id}_{self.started:%Y%m%d_%H%M%S}.txt.gz"
+        return discord.File(self._file, filename=name)
+
+    def close(self):
+        if not self._gzip.closed:
+            self._gzip.close()
+        self._file.close()
+
+def claim(channel_id, ids):
+    """Mark message ids as removed by a bulk action that logs them itself."""
+    _claimed.setdefault(channel_id, set()).update(ids)
+
+def _release(channel_id, ids):
+    claimed = _claimed.get(channel_id)
+    if claimed is not None:
+        claimed -= ids
+        if not claimed:
+            del _claimed[channel_id]
+
+def release_later(transcript):
+    """Stop claiming this transcript's messages once their delete events have arrived."""
+    release_ids_later(transcript.channel.id, transcript.ids)
+
+def release_ids_later(channel_id, ids):
+    asyncio.get_running_loop().call_later(CLAIM_GRACE, _release, channel_id, set(ids))
+
+def covers(channel_id, message_id):
+    """True if this message is being removed by a transcript-logged bulk delete."""
+    claimed = _claimed.get(channel_id)
+    return claimed is not None and message_id in claimed
@@ -0,0 +1,118 @@
+import heapq
+import discord
+from utils import database
+from utils.storage import get_backend
+
+class VoiceStore(database.ResidentStore):
+    """
+    Open voice sessions keyed by (guild id, member id), plus per-guild voice
+    time totals per member and per channel (seconds).
+
+    Totals are plain int counters; a guild's record is only serialized when
+    the write-behind flusher picks it up, not on every leave.
+    """
+    def __init__(self):
+        super().__init__()
+        self.loaded = False
+        self._sessions = {}  # guild id -> {member id: (channel id, aware start time)}
+        self._members = {}   # guild id -> {member id: seconds}
+        self._channels = {}  # guild id -> {channel id: seconds}
+
+    # --- LOADING ---
+    async def load(self):
+        if self.loaded:
+            return
+        self._records = await database.run_blocking(lambda: get_backend().load_voice_stats())
+        for guild_id, record in self._records.items():
+            self._members[int(guild_id)] = {int(k): v for k, v in record.get("members", {}).items()}
+            self._channels[int(guild_id)] = {int(k): v for k, v in record.get("channels", {}).items()}
+        self.loaded = True
+        database.register_store(self)
+
+    async def rebuild(self, guild):
+        """Match open sessions to guild.voice_states (startup and reconnects)."""
+        now = discord.utils.utcnow()
+        in_voice = {member_id: state.channel.id for member_id, state in guild.voice_states.items() if state.channel}
+        sessions = self._sessions.get(guild.id, {})
+        for member_id, (channel_id, _) in list(sessions.items()):
+            if in_voice.get(member_id) != channel_id:
+                # Left (or moved) while we weren't watching: count up to now
+                await self.leave(guild.id, member_id, now)
+        sessions = self._sessions.setdefault(guild.id, {})
+        for member_id, channel_id in in_voice.items():
+            if member_id not in sessions:
+                sessions[member_id] = (channel_id, now)
+
+    def forget_guild(self, guild_id):
+        self._sessions.pop(guild_id, None)
+
+    # --- SESSIONS ---
+    def join(self, guild_id, member_id, channel_id, at=None):
+        self._sessions.setdefault(guild_id, {})[member_id] = (channel_id, at or discord.utils.utcnow())
+
+    async def leave(self, guild_id, member_id, at=None):
+        """Close a session and add it to the totals. Returns its length in seconds (None if unknown)."""
+        seconds = self._close(guild_id, member_id, at or discord.utils.utcnow())
+        if seconds:
+            await database.request_flush()
+        return seconds
+
+    async def close_all(self):
+        """Count every open session up to now (shutdown / cog unload); rebuild() reopens them."""
+        now = discord.utils.utcnow()
+        closed = 0
+        for guild_id, sessions in list(self._sessions.items()):
+            for member_id in list(sessions):
+                closed += self._close(guild_id, member_id, now) or 0
+        if closed:
+            await database.request_flush()
+
+    def _close(self, guild_id, member_id, at):
+        sessions = self._sessions.get(guild_id)
+        session = sessions.pop(member_id, None) if sessions else None
+        if session is None:
+            return None
+        channel_id, start = session
+        seconds = max(0, int((at - start).total_seconds()))
+        if seconds:
+            members = self._members.setdefault(guild_id, {})
+            members[member_id] = members.get(member_id, 0) + seconds
+            channels = self._channels.setdefault(guild_id, {})
+            channels[channel_id] = channels.get(channel_id, 0) + seconds
+            self._dirty.add(str(guild_id))
+        return seconds
+
+    async def move(self, guild_id, member_id, channel_id, at=None):
+        at = at or discord.utils.utcnow()
+        await self.leave(guild_id, member_id, at)
+        self.join(guild_id, member_id, channel_id, at)
+
+    # --- STATS ---
+    def top(self, guild_id, kind="members", limit=10):
+        """Top (id, seconds) pairs, including time in sessions that are still open."""
+        totals = dict((self._members if kind == "members" else self._channels).get(guild_id, {}))
+        now = discord.utils.utcnow()
+        for member_id, (channel_id, start) in self._sessions.get(guild_id, {}).items():
+            key = member_id if kind == "members" else channel_id
+            totals[key] = totals.get(key, 0) + int((now - start).total_seconds())
+        return heapq.nlargest(limit, totals.items(), key=lambda item: item[1])
+
+    def active(self, guild_id):
+        return len(self._sessions.get(guild_id, ()))
+
+    # --- PERSISTENCE ---
+    def take_pending(self):
+        # Serialize only the guilds that changed since the last flush
+        for key in self._dirty:
+            guild_id = int(key)
+            self._records[key] = {
+                "members": {str(k): v for k, v in self._members.get(guild_id, {}).items()},
+                "channels": {str(k): v for k, v in self._channels.get(guild_id, {}).items()},
+            }
+        return super().take_pending()
+
+    def write_batch(self, backend, changed, deleted, all_records):
+        backend.save_voice_batch(changed, deleted, all_records)
+
+# Process-wide tracker, loaded by the logging cog
+voice = VoiceStore()